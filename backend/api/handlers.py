@@ -1,14 +1,25 @@
-import json
-import uuid
+import logging
+import secrets
+import threading
 from datetime import datetime
 from typing import Dict, Any, Optional
 
+import orjson
+from cachetools import TTLCache
+
+from config import ANALYSIS_JOB_MAX_COUNT, ANALYSIS_JOB_TTL_SECONDS, ANALYSIS_LOG_PATH
 from services.llm_service import analyze_conversation
 from services.export_service import generate_csv_from_data
 from fastapi.concurrency import run_in_threadpool
 
-# 작업 상태 저장소
-analysis_jobs: Dict[str, Dict[str, Any]] = {}
+logger = logging.getLogger(__name__)
+
+# 작업 상태 저장소 (개수와 보관 기간을 제한하여 완료된 결과가 메모리에 계속 쌓이지 않도록 함)
+analysis_jobs: Dict[str, Dict[str, Any]] = TTLCache(maxsize=ANALYSIS_JOB_MAX_COUNT, ttl=ANALYSIS_JOB_TTL_SECONDS)
+
+# 분석 결과 로그 파일 (첫 기록 시 한 번만 열고 작업마다 한 줄씩 추가, 앱 종료 시 close_analysis_log로 닫음)
+_analysis_log_file = None
+_analysis_log_lock = threading.Lock()
 
 async def handle_analyze_chat(conversation: str, start_date: Optional[str], end_date: Optional[str], shop_name: Optional[str]) -> Dict[str, Any]:
     """
@@ -25,7 +36,7 @@ async def handle_analyze_chat(conversation: str, start_date: Optional[str], end_
     """
     try:
         # 작업 ID 생성
-        job_id = str(uuid.uuid4())
+        job_id = secrets.token_hex(16)
         
         # 초기 상태 저장
         analysis_jobs[job_id] = {
@@ -66,7 +77,7 @@ async def handle_analyze_file(file_content: str, shop_name: Optional[str], start
     """
     try:
         # 작업 ID 생성
-        job_id = str(uuid.uuid4())
+        job_id = secrets.token_hex(16)
         
         # 초기 상태 저장
         analysis_jobs[job_id] = {
@@ -161,6 +172,37 @@ async def handle_list_jobs() -> Dict[str, Dict[str, Any]]:
         for job_id, job in analysis_jobs.items()
     }
 
+def _write_analysis_log(job_id: str, result: Dict[str, Any]) -> None:
+    """
+    분석 결과를 JSONL 로그 파일에 한 줄로 추가합니다.
+    
+    Args:
+        job_id: 작업 ID
+        result: 분석 결과
+    """
+    line = orjson.dumps(
+        {"job_id": job_id, "timestamp": datetime.now().isoformat(), "result": result},
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+    )
+    global _analysis_log_file
+    # 스레드 풀의 여러 작업이 동시에 기록할 수 있으므로 줄 단위로 잠금
+    with _analysis_log_lock:
+        if _analysis_log_file is None:
+            _analysis_log_file = open(ANALYSIS_LOG_PATH, "ab")
+        _analysis_log_file.write(line)
+        _analysis_log_file.flush()
+    logger.info("분석 결과가 %s 파일에 저장되었습니다 (job_id=%s).", ANALYSIS_LOG_PATH, job_id)
+
+def close_analysis_log() -> None:
+    """
+    분석 결과 로그 파일이 열려 있으면 닫습니다 (앱 종료 시 호출).
+    """
+    global _analysis_log_file
+    with _analysis_log_lock:
+        if _analysis_log_file is not None:
+            _analysis_log_file.close()
+            _analysis_log_file = None
+
 async def process_conversation_task(job_id: str, conversation: str, start_date: Optional[str] = None, end_date: Optional[str] = None, shop_name: Optional[str] = None) -> None:
     """
     백그라운드에서 대화 분석을 처리하는 태스크.
@@ -172,9 +214,15 @@ async def process_conversation_task(job_id: str, conversation: str, start_date:
         end_date: 종료일 (ISO 형식)
         shop_name: 상점 이름
     """
+    # 저장소에서 만료되더라도 진행 중인 작업 상태는 계속 갱신할 수 있도록 참조를 보관
+    job = analysis_jobs.get(job_id)
+    if job is None:
+        logger.warning("작업을 찾을 수 없습니다 (만료됨): %s", job_id)
+        return
+    
     try:
         # 대화 분석 요청
-        analysis_jobs[job_id]["status"] = "analyzing"
+        job["status"] = "analyzing"
         
         # LLM 서비스로 분석 요청 (별도 스레드에서 실행하여 이벤트 루프 블로킹 방지)
         result = await run_in_threadpool(
@@ -187,24 +235,22 @@ async def process_conversation_task(job_id: str, conversation: str, start_date:
         
         # 분석 결과 확인
         if "error" in result:
-            analysis_jobs[job_id]["status"] = "failed"
-            analysis_jobs[job_id]["error"] = result.get("message", "분석 중 오류가 발생했습니다")
+            job["status"] = "failed"
+            job["error"] = result.get("message", "분석 중 오류가 발생했습니다")
         else:
             # 성공적으로 분석 완료
-            analysis_jobs[job_id]["status"] = "completed"
-            analysis_jobs[job_id]["result"] = result
+            job["status"] = "completed"
+            job["result"] = result
             
             # shop_name 저장
             if shop_name:
                 result["shop_name"] = shop_name
             
-            # 응답 데이터 로그 저장
-            with open(f"analysis_log_{job_id}.json", "w", encoding="utf-8") as log_file:
-                json.dump(result, log_file, ensure_ascii=False, indent=2)
-                print(f"분석 결과가 analysis_log_{job_id}.json 파일에 저장되었습니다.")
+            # 응답 데이터 로그 저장 (파일 쓰기도 이벤트 루프 밖에서 수행)
+            await run_in_threadpool(_write_analysis_log, job_id, result)
                 
     except Exception as e:
         # 오류 발생 시
-        analysis_jobs[job_id]["status"] = "failed"
-        analysis_jobs[job_id]["error"] = str(e)
+        job["status"] = "failed"
+        job["error"] = str(e)
         print(f"분석 중 오류 발생: {str(e)}")
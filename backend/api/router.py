@@ -1,3 +1,5 @@
+import codecs
+
 from fastapi import APIRouter, HTTPException, BackgroundTasks, UploadFile, File, Form, Body
 from typing import Dict, Any, Optional
 
@@ -19,6 +21,9 @@ from api.handlers import (
 # API 라우터 생성
 router = APIRouter(prefix="/api")
 
+# 업로드 파일을 한 번에 읽어 들일 크기 (1MB)
+_UPLOAD_READ_CHUNK_SIZE = 1 << 20
+
 @router.post("/analyze", response_model=AnalysisResponse)
 async def analyze_chat(request: ConversationRequest, background_tasks: BackgroundTasks):
     """
@@ -63,9 +68,13 @@ async def analyze_chat_from_file(
     업로드된 TXT 파일에서 KakaoTalk 대화 내용을 분석합니다.
     """
     try:
-        # 파일 내용 읽기
-        content = await file.read()
-        conversation = content.decode('utf-8')
+        # 파일 내용을 청크 단위로 읽으면서 점진적으로 디코딩 (청크 경계에 걸친 멀티바이트 문자도 이어서 처리)
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        parts = []
+        while chunk := await file.read(_UPLOAD_READ_CHUNK_SIZE):
+            parts.append(decoder.decode(chunk))
+        parts.append(decoder.decode(b"", final=True))
+        conversation = "".join(parts)
         
         if not conversation.strip():
             return {"success": False, "error": "파일 내용이 비어있습니다"}
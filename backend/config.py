@@ -4,6 +4,29 @@ from dotenv import load_dotenv
 # 환경 변수 로드
 load_dotenv()
 
+def _get_positive_int_env(name: str, default: int) -> int:
+    """
+    환경 변수를 1 이상의 정수로 읽습니다. (1 미만은 1로 보정)
+    
+    Args:
+        name: 환경 변수 이름
+        default: 환경 변수가 없을 때 사용할 기본값
+        
+    Returns:
+        1 이상의 정수 값
+        
+    Raises:
+        ValueError: 환경 변수 값이 정수가 아닌 경우
+    """
+    raw_value = os.getenv(name)
+    if raw_value is None or not raw_value.strip():
+        return default
+    try:
+        value = int(raw_value)
+    except ValueError:
+        raise ValueError(f"환경 변수 {name}는 정수여야 합니다 (현재 값: {raw_value!r})") from None
+    return max(1, value)
+
 # API 키 설정
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
@@ -19,3 +42,14 @@ API_TITLE = "KakaoOrder API"
 API_HOST = "0.0.0.0"
 # Use dynamic port (Railway provides PORT env var)
 API_PORT = int(os.getenv("PORT", 8000))
+
+# 분석 작업 저장소 설정
+ANALYSIS_JOB_MAX_COUNT = 1024  # 보관할 최대 작업 수
+ANALYSIS_JOB_TTL_SECONDS = 3600  # 작업 보관 기간 (초)
+
+# 대화 분석 청크 설정 (이 길이를 넘는 대화만 나누어 요청하며, 나눌 때도 같은 크기로 채움)
+ANALYSIS_CHUNK_SIZE = _get_positive_int_env("ANALYSIS_CHUNK_SIZE", 60000)  # 한 번의 요청으로 분석할 최대 대화 길이 (문자 수)
+ANALYSIS_MAX_CONCURRENCY = _get_positive_int_env("ANALYSIS_MAX_CONCURRENCY", 5)  # 동시에 보낼 청크 분석 요청 수
+
+# 분석 결과 로그 설정 (작업별 파일 대신 하나의 JSONL 파일에 이어서 기록)
+ANALYSIS_LOG_PATH = os.getenv("ANALYSIS_LOG_PATH", "analysis_log.jsonl")
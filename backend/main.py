@@ -1,11 +1,21 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 from api.router import router
+from api.handlers import close_analysis_log
 from config import API_TITLE, API_HOST, API_PORT
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 종료 시 분석 결과 로그 파일 닫기
+    close_analysis_log()
+
 # Create FastAPI app
-app = FastAPI(title=API_TITLE)
+app = FastAPI(title=API_TITLE, default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Add CORS middleware to allow frontend to call the API
 app.add_middleware(
@@ -1,22 +1,42 @@
 import json
+import logging
 import re
 import concurrent.futures
 from typing import List, Dict, Any, Optional
 from datetime import datetime
-import traceback
 
 from utils.text_processing import (
     filter_conversation_by_date,
-    split_conversation_into_chunks,
-    is_valid_item_name
+    split_conversation_into_chunks
 )
 from utils.validation import (
+    is_valid_item_name,
     is_valid_order_format,
     validate_analysis_result,
     filter_invalid_items
 )
 from services.llm_service import analyze_conversation_chunk
 
+logger = logging.getLogger(__name__)
+
+def _parse_quantity(quantity: Any, default: Any = None) -> Any:
+    """
+    문자열 수량을 정수로 변환합니다 (쉼표 제거). 문자열이 아니면 그대로 반환합니다.
+    
+    Args:
+        quantity: 변환할 수량
+        default: 문자열을 정수로 변환할 수 없을 때 반환할 값
+        
+    Returns:
+        변환된 수량
+    """
+    if isinstance(quantity, str):
+        try:
+            return int(quantity.replace(",", ""))
+        except ValueError:
+            return default
+    return quantity
+
 def process_conversation(
     conversation_text: str, 
     start_date: Optional[str] = None, 
@@ -36,13 +56,18 @@ def process_conversation(
         분석 결과
     """
     try:
-        print(f"Starting analysis: shop_name={shop_name}, start_date={start_date}, end_date={end_date}")
-        print(f"Conversation length: {len(conversation_text)} characters")
+        logger.info("Starting analysis: shop_name=%s, start_date=%s, end_date=%s", shop_name, start_date, end_date)
+        logger.info("Conversation length: %d characters", len(conversation_text))
         
         # 날짜 범위로 대화 필터링
         if start_date or end_date:
             conversation_text = filter_conversation_by_date(conversation_text, start_date, end_date)
-            print(f"Filtered conversation length: {len(conversation_text)} characters")
+            if conversation_text is None:
+                return {
+                    "error": True,
+                    "message": "지정된 날짜 범위에 해당하는 대화가 없습니다."
+                }
+            logger.info("Filtered conversation length: %d characters", len(conversation_text))
         
         # LLM을 통한 대화 분석
         result = analyze_conversation_with_llm(conversation_text, shop_name)
@@ -64,12 +89,11 @@ def process_conversation(
         if shop_name:
             result["shop_name"] = shop_name
             
-        print(f"분석 완료: {len(result.get('time_based_orders', []))}개 주문, {len(result.get('item_based_summary', []))}개 품목")
+        logger.info("분석 완료: %d개 주문, %d개 품목", len(result.get('time_based_orders', [])), len(result.get('item_based_summary', [])))
         return result
         
     except Exception as e:
-        print(f"대화 분석 중 오류 발생: {str(e)}")
-        traceback.print_exc()
+        logger.error("대화 분석 중 오류 발생: %s", e, exc_info=True)
         return {
             "error": True,
             "message": str(e)
@@ -88,9 +112,9 @@ def analyze_conversation_with_llm(conversation_text: str, shop_name: Optional[st
     """
     # 대화가 길 경우 여러 청크로 분할하여 처리
     if len(conversation_text) > 32000:
-        print(f"대화가 너무 깁니다({len(conversation_text)} 자). 여러 청크로 분할합니다.")
+        logger.info("대화가 너무 깁니다(%d 자). 여러 청크로 분할합니다.", len(conversation_text))
         chunks = split_conversation_into_chunks(conversation_text)
-        print(f"{len(chunks)}개의 청크로 분할되었습니다.")
+        logger.info("%d개의 청크로 분할되었습니다.", len(chunks))
         
         # 병렬 처리를 위한 스레드 풀 생성
         chunk_results = []
@@ -104,10 +128,10 @@ def analyze_conversation_with_llm(conversation_text: str, shop_name: Optional[st
                 chunk_index = future_to_chunk[future]
                 try:
                     result = future.result()
-                    print(f"청크 {chunk_index} 분석 완료")
+                    logger.debug("청크 %d 분석 완료", chunk_index)
                     chunk_results.append(result)
                 except Exception as e:
-                    print(f"청크 {chunk_index} 분석 중 오류: {str(e)}")
+                    logger.error("청크 %d 분석 중 오류: %s", chunk_index, e)
         
         # 분할 결과 병합
         return merge_chunk_results(chunk_results)
@@ -150,19 +174,12 @@ def merge_chunk_results(chunk_results: List[Dict[str, Any]]) -> Dict[str, Any]:
                 if item_name not in item_summary:
                     item_summary[item_name] = item_entry
                 else:
-                    # 수량 합산
-                    current_qty = item_summary[item_name].get("total_quantity", 0)
-                    additional_qty = item_entry.get("total_quantity", 0)
+                    # 수량 합산 (둘 중 하나라도 숫자로 변환할 수 없으면 원래 값 유지)
+                    current_qty = _parse_quantity(item_summary[item_name].get("total_quantity", 0))
+                    additional_qty = _parse_quantity(item_entry.get("total_quantity", 0))
                     
-                    try:
-                        if isinstance(current_qty, str):
-                            current_qty = int(current_qty.replace(",", ""))
-                        if isinstance(additional_qty, str):
-                            additional_qty = int(additional_qty.replace(",", ""))
-                            
+                    if isinstance(current_qty, (int, float)) and isinstance(additional_qty, (int, float)):
                         item_summary[item_name]["total_quantity"] = current_qty + additional_qty
-                    except:
-                        pass
                     
                     # 주문자 목록 합산
                     current_customers = item_summary[item_name].get("customers", "")
@@ -196,7 +213,7 @@ def merge_chunk_results(chunk_results: List[Dict[str, Any]]) -> Dict[str, Any]:
                 merged_result["order_pattern_analysis"]["sold_out_items"] = merged_result["order_pattern_analysis"].get("sold_out_items", [])
                 merged_result["order_pattern_analysis"]["sold_out_items"].extend(result["order_pattern_analysis"]["sold_out_items"])
     
-    print(f"분석 결과 병합 완료: {len(merged_result.get('time_based_orders', []))}개 주문")
+    logger.info("분석 결과 병합 완료: %d개 청크, %d개 주문", len(chunk_results), len(merged_result.get('time_based_orders', [])))
     return merged_result
 
 def summarize_items(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -222,12 +239,8 @@ def summarize_items(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         quantity = order.get("quantity", 0)
         customer = order.get("customer", "")
         
-        # 수량 변환
-        if isinstance(quantity, str):
-            try:
-                quantity = int(quantity.replace(",", ""))
-            except:
-                quantity = 1
+        # 수량 변환 (변환할 수 없는 문자열은 1개로 처리)
+        quantity = _parse_quantity(quantity, 1)
         
         # 품목 요약 생성 또는 업데이트
         if item not in item_summary:
@@ -250,6 +263,6 @@ def summarize_items(orders: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
                 item_summary[item]["customers"] = customer_entry
     
     if filtered_items_count > 0:
-        print(f"품목 필터링: {filtered_items_count}개의 잘못된 품목명이 제외되었습니다.")
+        logger.info("품목 필터링: %d개의 잘못된 품목명이 제외되었습니다.", filtered_items_count)
     
     return list(item_summary.values())
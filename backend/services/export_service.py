@@ -1,4 +1,7 @@
 import base64
+import codecs
+import csv
+import io
 from typing import Dict, List, Any
 
 def generate_csv_from_data(data: Dict[str, Any]) -> Dict[str, str]:
@@ -38,18 +41,18 @@ def generate_csv_from_data(data: Dict[str, Any]) -> Dict[str, str]:
         
         if "time_based_orders" in data:
             headers = ["time", "customer", "item", "quantity", "note"]
-            csv_data = _to_csv(data["time_based_orders"], headers, time_header_map)
-            result["time_based_csv"] = base64.b64encode(csv_data.encode("utf-8")).decode()
+            csv_bytes = _to_csv(data["time_based_orders"], headers, time_header_map)
+            result["time_based_csv"] = base64.b64encode(csv_bytes).decode("ascii")
         
         if "item_based_summary" in data:
             headers = ["item", "total_quantity", "customers"]
-            csv_data = _to_csv(data["item_based_summary"], headers, item_header_map)
-            result["item_based_csv"] = base64.b64encode(csv_data.encode("utf-8")).decode()
+            csv_bytes = _to_csv(data["item_based_summary"], headers, item_header_map)
+            result["item_based_csv"] = base64.b64encode(csv_bytes).decode("ascii")
         
         if "customer_based_orders" in data:
             headers = ["customer", "item", "quantity", "note"]
-            csv_data = _to_csv(data["customer_based_orders"], headers, customer_header_map)
-            result["customer_based_csv"] = base64.b64encode(csv_data.encode("utf-8")).decode()
+            csv_bytes = _to_csv(data["customer_based_orders"], headers, customer_header_map)
+            result["customer_based_csv"] = base64.b64encode(csv_bytes).decode("ascii")
         
         return result
         
@@ -57,9 +60,9 @@ def generate_csv_from_data(data: Dict[str, Any]) -> Dict[str, str]:
         print(f"CSV 생성 중 오류 발생: {str(e)}")
         return {}
 
-def _to_csv(data_list: List[Dict[str, Any]], headers: List[str], header_map: Dict[str, str]) -> str:
+def _to_csv(data_list: List[Dict[str, Any]], headers: List[str], header_map: Dict[str, str]) -> bytes:
     """
-    데이터 목록을 CSV 문자열로 변환합니다.
+    데이터 목록을 UTF-8로 인코딩된 CSV 바이트로 변환합니다.
     
     Args:
         data_list: 변환할 데이터 목록
@@ -67,26 +70,18 @@ def _to_csv(data_list: List[Dict[str, Any]], headers: List[str], header_map: Dic
         header_map: CSV 헤더 매핑 (영문 -> 한글)
         
     Returns:
-        CSV 문자열
+        UTF-8 CSV 바이트
     """
-    # CSV 헤더 추가
-    header_row = []
-    for h in headers:
-        header_row.append(f'"{header_map[h]}"')
+    buffer = io.BytesIO()
+    # 행을 쓰는 즉시 UTF-8 바이트로 인코딩하여 문자열 사본을 따로 만들지 않음
+    stream = codecs.getwriter("utf-8")(buffer)
+    # 모든 셀을 따옴표로 감싸고 내부 따옴표 이스케이프는 C로 구현된 csv 모듈에 맡김
+    writer = csv.writer(stream, quoting=csv.QUOTE_ALL, lineterminator="\n")
     
-    rows = [",".join(header_row)]
+    # CSV 헤더 추가
+    writer.writerow([header_map[h] for h in headers])
     
     # 데이터 행 추가
-    for item in data_list:
-        row = []
-        for h in headers:
-            value = item.get(h, "")
-            if isinstance(value, str):
-                # 특수문자 처리
-                value = value.replace('"', '""')
-                row.append(f'"{value}"')
-            else:
-                row.append(f'"{str(value)}"')
-        rows.append(",".join(row))
-        
-    return "\n".join(rows)
+    writer.writerows([item.get(h, "") for h in headers] for item in data_list)
+    
+    return buffer.getvalue()
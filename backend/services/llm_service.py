@@ -1,26 +1,46 @@
 import os
+import sys
 import json
 import re
 import traceback
 import logging
+import random
+import threading
+import time
 from datetime import datetime
 import pathlib
-from typing import List, Dict, Any, Optional, Set
+from typing import List, Dict, Any, Optional, Set, Tuple, Union
 import concurrent.futures
 from collections import defaultdict
+from itertools import islice
+from operator import itemgetter
 
 import anthropic
+import orjson
 
-from config import ANTHROPIC_API_KEY
-from utils.text_processing import filter_conversation_by_date, split_conversation_into_chunks
+from config import ANTHROPIC_API_KEY, ANALYSIS_CHUNK_SIZE, ANALYSIS_MAX_CONCURRENCY
+from utils.text_processing import filter_conversation_by_date, iter_conversation_chunks
 from utils.validation import validate_analysis_result, filter_invalid_items, is_valid_item_name
-from services.preprocess_chat import ChatPreprocessor
+from services.preprocess_chat import get_preprocessor
+
+logger = logging.getLogger(__name__)
+
+# 메인 분석 스트림 도중 발생한 일시적 오류의 최대 시도 횟수와 지수 백오프 기준 대기 시간(초)
+# (요청 생성 단계의 오류는 SDK 클라이언트의 기본 재시도에 맡김)
+_STREAM_MAX_ATTEMPTS = 3
+_STREAM_BACKOFF_BASE_SECONDS = 1.0
+
+# 스트림 도중 오류 이벤트로 전달되는 일시적 오류 유형 (HTTP 상태 코드는 200으로 남음)
+_RETRYABLE_STREAM_ERROR_TYPES = frozenset({"overloaded_error", "api_error", "rate_limit_error"})
 
 # Initialize Claude client
 client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
+# 메인/대체 호출을 모두 합친 동시 API 호출 상한 (대체 호출 풀은 메인 풀의 각 작업자 안에서 실행됨)
+_api_call_semaphore = threading.BoundedSemaphore(ANALYSIS_MAX_CONCURRENCY)
+
 # 채팅 전처리기 초기화
-chat_preprocessor = ChatPreprocessor()
+chat_preprocessor = get_preprocessor()
 
 def analyze_conversation(
     conversation_text: str,
@@ -31,101 +51,89 @@ def analyze_conversation(
     """
     클로드를 사용하여 대화를 분석하고 주문 정보를 추출합니다.
     """
-    print(f"Starting analysis: shop_name={shop_name}, start_date={start_date}, end_date={end_date}")
-    print(f"원본 대화 길이: {len(conversation_text)} 문자")
+    logger.info("Starting analysis: shop_name=%s, start_date=%s, end_date=%s", shop_name, start_date, end_date)
+    logger.info("원본 대화 길이: %d 문자", len(conversation_text))
     
     # 1. 날짜 필터링
     preprocessed_text = conversation_text
     if start_date or end_date:
         filtered_text = filter_conversation_by_date(conversation_text, start_date, end_date)
-        print(f"날짜 필터링 후 대화 길이: {len(filtered_text)} 문자")
         
-        if filtered_text == "지정된 날짜 범위에 해당하는 대화가 없습니다.":
-            print("⚠️ 경고: 지정된 날짜 범위에 해당하는 대화가 없습니다.")
+        if filtered_text is None:
+            logger.warning("지정된 날짜 범위에 해당하는 대화가 없습니다.")
             return {
                 "error": True,
                 "message": "지정된 날짜 범위에 해당하는 대화가 없습니다."
             }
             
+        logger.info("날짜 필터링 후 대화 길이: %d 문자", len(filtered_text))
         preprocessed_text = filtered_text
     
     # 2. 불필요한 메시지 제거
     try:
-        # 전처리 전에 원본 대화에 대한 통계 출력
-        stats = chat_preprocessor.get_statistics(preprocessed_text)
-        print("대화 통계:")
-        print(f"  - 전체 메시지: {stats['전체 메시지']}줄")
-        print(f"  - 입장 메시지: {stats['입장 메시지']}줄")
-        print(f"  - 퇴장 메시지: {stats['퇴장 메시지']}줄")
-        print(f"  - 삭제된 메시지: {stats['삭제된 메시지']}줄")
-        print(f"  - 봇 메시지: {stats['봇 메시지']}줄")
-        print(f"  - 미디어 메시지: {stats['미디어 메시지']}줄")
-        print(f"  - 날짜 구분선: {stats['날짜 구분선']}줄")
+        # 전처리 전에 원본 대화에 대한 통계 출력 (로그 출력용이므로 INFO 레벨이 꺼져 있으면 계산하지 않음)
+        if logger.isEnabledFor(logging.INFO):
+            stats = chat_preprocessor.get_statistics(preprocessed_text)
+            logger.info("대화 통계:")
+            logger.info("  - 전체 메시지: %d줄", stats['전체 메시지'])
+            logger.info("  - 입장 메시지: %d줄", stats['입장 메시지'])
+            logger.info("  - 퇴장 메시지: %d줄", stats['퇴장 메시지'])
+            logger.info("  - 삭제된 메시지: %d줄", stats['삭제된 메시지'])
+            logger.info("  - 봇 메시지: %d줄", stats['봇 메시지'])
+            logger.info("  - 미디어 메시지: %d줄", stats['미디어 메시지'])
+            logger.info("  - 날짜 구분선: %d줄", stats['날짜 구분선'])
         
         # 전처리 실행
         preprocessed_text = chat_preprocessor.preprocess_chat(preprocessed_text)
-        print(f"전처리 후 대화 길이: {len(preprocessed_text)} 문자")
+        logger.info("전처리 후 대화 길이: %d 문자", len(preprocessed_text))
         
         # 전처리된 대화 저장 (선택적)
         _save_preprocessed_text(preprocessed_text, shop_name)
         
     except Exception as e:
-        print(f"대화 전처리 중 오류 발생: {str(e)}")
-        print("필터링된 대화로 계속 진행합니다.")
+        logger.warning("대화 전처리 중 오류 발생: %s", e)
+        logger.warning("필터링된 대화로 계속 진행합니다.")
     
     # 3. 판매자 메시지에서 판매 상품 정보 추출
     try:
-        from services.product_service import get_available_products, extract_product_info
-        # available_products는 get_available_products에서 Set[str] 형태로 상품명만 가져옵니다.
-        available_products_set = get_available_products(preprocessed_text)
-        
-        # product_info는 extract_product_info에서 Dict[str, List[Dict[str, str]]] 형태로 카테고리별 상품 상세 정보를 가져옵니다.
-        # 이 정보를 LLM이 직접 참고하도록 전달하는 것이 더 유용할 수 있습니다.
-        # 혹은 여기서 상품명 리스트만 뽑아서 전달할 수도 있습니다. 여기서는 상품명 리스트를 전달하는 것으로 가정합니다.
-        # 만약 product_info 전체를 활용하고 싶다면, analyze_conversation_chunk 및 _create_user_prompt의 인자 타입 변경 필요.
+        from services.product_service import extract_product_info
+        # extract_product_info는 Dict[str, List[Dict[str, str]]] 형태로 상품 상세 정보를 가져옵니다.
+        # get_available_products도 내부적으로 같은 LLM 추출을 수행하므로, 한 번만 호출하고 상품명을 여기서 뽑아 씁니다.
         product_info_dict = extract_product_info(preprocessed_text)
         
-        # product_info_dict에서 실제 상품명 리스트를 추출하여 available_products_for_llm 로 전달
-        all_product_names_from_info = set()
-        if isinstance(product_info_dict, dict) and "products" in product_info_dict and isinstance(product_info_dict["products"], list):
-            for product_detail in product_info_dict["products"]:
-                if isinstance(product_detail, dict) and "name" in product_detail:
-                    all_product_names_from_info.add(product_detail["name"])
-        
-        # 만약 get_available_products의 결과와 extract_product_info의 결과를 합치거나, 
-        # 둘 중 더 신뢰도 높은 것을 선택할 수도 있습니다. 여기서는 extract_product_info 결과를 우선합니다.
-        final_product_list_for_llm = all_product_names_from_info if all_product_names_from_info else available_products_set
+        # product_info_dict에서 실제 상품명 리스트를 추출하여 LLM에 전달
+        final_product_list_for_llm = _collect_product_names(product_info_dict)
 
-        print(f"전체 대화에서 추출한 판매 상품 정보 (LLM 전달용): {len(final_product_list_for_llm)}개 상품")
-        if final_product_list_for_llm:
-            print(f"  - 예시 상품: {', '.join(list(final_product_list_for_llm)[:5])}{'...' if len(final_product_list_for_llm) > 5 else ''}")
+        logger.info("전체 대화에서 추출한 판매 상품 정보 (LLM 전달용): %d개 상품", len(final_product_list_for_llm))
+        if final_product_list_for_llm and logger.isEnabledFor(logging.INFO):
+            logger.info("  - 예시 상품: %s%s", ', '.join(islice(final_product_list_for_llm, 5)),
+                        '...' if len(final_product_list_for_llm) > 5 else '')
 
     except Exception as e:
-        print(f"상품 정보 추출 중 오류 발생: {str(e)}")
+        logger.error("상품 정보 추출 중 오류 발생: %s", e)
         final_product_list_for_llm = set()
     
     # 4. 대화가 길 경우 여러 청크로 분할하여 처리
-    if len(preprocessed_text) > 60000:
-        print(f"대화가 너무 깁니다({len(preprocessed_text)} 자). 여러 청크로 분할합니다.")
-        chunks = split_conversation_into_chunks(preprocessed_text)
-        print(f"{len(chunks)}개의 청크로 분할되었습니다.")
+    if len(preprocessed_text) > ANALYSIS_CHUNK_SIZE:
+        logger.info("대화가 너무 깁니다(%d 자). 여러 청크로 분할합니다.", len(preprocessed_text))
         
-        # 병렬 처리를 위한 스레드 풀 생성
+        # 병렬 처리를 위한 스레드 풀 생성 (청크가 분할되는 대로 바로 분석 요청 제출)
         results = []
-        with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(chunks), 5)) as executor:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=ANALYSIS_MAX_CONCURRENCY) as executor:
             future_to_chunk = {
                 executor.submit(analyze_conversation_chunk, chunk, shop_name, final_product_list_for_llm): i 
-                for i, chunk in enumerate(chunks)
+                for i, chunk in enumerate(iter_conversation_chunks(preprocessed_text, ANALYSIS_CHUNK_SIZE))
             }
+            logger.info("%d개의 청크로 분할되었습니다.", len(future_to_chunk))
             
             for future in concurrent.futures.as_completed(future_to_chunk):
                 chunk_index = future_to_chunk[future]
                 try:
                     result = future.result()
-                    print(f"청크 {chunk_index} 분석 완료")
+                    logger.info("청크 %d 분석 완료", chunk_index)
                     results.append(result)
                 except Exception as e:
-                    print(f"청크 {chunk_index} 분석 중 오류: {str(e)}")
+                    logger.error("청크 %d 분석 중 오류: %s", chunk_index, e)
         
         # 분할 결과 병합
         return _merge_chunk_results(results)
@@ -134,6 +142,27 @@ def analyze_conversation(
         return analyze_conversation_chunk(preprocessed_text, shop_name, final_product_list_for_llm)
     
 
+def _collect_product_names(product_info_dict: Any) -> Set[str]:
+    """
+    extract_product_info 결과에서 상품명 집합을 만듭니다.
+    
+    Args:
+        product_info_dict: extract_product_info 반환값 ({"products": [...]} 형태)
+        
+    Returns:
+        Set[str]: 상품명 집합 (형식이 맞지 않으면 빈 집합)
+    """
+    if not isinstance(product_info_dict, dict):
+        return set()
+    products = product_info_dict.get("products")
+    if not isinstance(products, list):
+        return set()
+    # 상품마다 add()를 호출하지 않고 집합 내포로 한 번에 구성
+    return {
+        product_detail["name"] for product_detail in products
+        if isinstance(product_detail, dict) and "name" in product_detail
+    }
+
 def _save_preprocessed_text(preprocessed_text: str, shop_name: Optional[str] = None) -> str:
     """
     전처리된 대화 텍스트를 파일로 저장합니다.
@@ -159,19 +188,19 @@ def _save_preprocessed_text(preprocessed_text: str, shop_name: Optional[str] = N
     try:
         with open(log_file_path, 'w', encoding='utf-8') as f:
             f.write(preprocessed_text)
-        print(f"전처리된 대화가 {log_file_path} 파일에 저장되었습니다.")
+        logger.info("전처리된 대화가 %s 파일에 저장되었습니다.", log_file_path)
     except Exception as e:
-        print(f"전처리된 대화 저장 중 오류 발생: {str(e)}")
+        logger.error("전처리된 대화 저장 중 오류 발생: %s", e)
         return "저장 실패"
     
     return str(log_file_path)
 
-def _save_api_response_to_file(response_content: str, shop_name: Optional[str] = None) -> str:
+def _save_api_response_to_file(response_content: Union[str, Dict[str, Any]], shop_name: Optional[str] = None) -> str:
     """
     Claude API 응답을 파일로 저장합니다.
     
     Args:
-        response_content (str): API 응답 내용
+        response_content (str | dict): API 응답 내용 (이미 파싱된 객체는 다시 직렬화/파싱하지 않고 그대로 저장)
         shop_name (str, optional): 상점 이름
         
     Returns:
@@ -191,14 +220,14 @@ def _save_api_response_to_file(response_content: str, shop_name: Optional[str] =
     try:
         # JSON으로 파싱 시도
         try:
-            json_content = json.loads(response_content)
+            json_content = orjson.loads(response_content) if isinstance(response_content, str) else response_content
             log_data = {
                 "timestamp": datetime.now().isoformat(),
                 "shop_name": shop_name,
                 "content_type": "json",
                 "content": json_content
             }
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             # JSON 파싱 실패 시 텍스트로 저장
             log_data = {
                 "timestamp": datetime.now().isoformat(),
@@ -208,8 +237,8 @@ def _save_api_response_to_file(response_content: str, shop_name: Optional[str] =
             }
         
         # 파일에 저장
-        with open(log_file_path, 'w', encoding='utf-8') as f:
-            json.dump(log_data, f, ensure_ascii=False, indent=2)
+        with open(log_file_path, 'wb') as f:
+            f.write(orjson.dumps(log_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
             
     except Exception as e:
         # 오류 발생 시 텍스트 파일로 저장 시도
@@ -220,13 +249,76 @@ def _save_api_response_to_file(response_content: str, shop_name: Optional[str] =
                 f.write(f"Shop Name: {shop_name}\n")
                 f.write("Error during JSON serialization\n")
                 f.write("-" * 80 + "\n")
-                f.write(response_content)
+                f.write(str(response_content))
         except Exception as text_write_error:
-            print(f"API 응답 로깅 중 오류 발생: {str(text_write_error)}")
+            logger.error("API 응답 로깅 중 오류 발생: %s", text_write_error)
             return "로깅 실패"
     
     return str(log_file_path)
 
+# 메인/대체 호출에서 사용할 도구 정의 (호출마다 다시 만들지 않도록 모듈 로드 시 한 번만 생성)
+_ORDER_EXTRACTION_TOOLS = [{
+    "name": "extract_order_info",
+    "description": "카카오톡 대화에서 주문 정보 및 패턴 분석 결과 추출",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "time_based_orders": {
+                "type": "array",
+                "description": "시간 순서대로 정렬된 개별 주문 내역입니다. 대화에서 언급된 모든 주문을 **하나도 빠짐없이, 가능한 모든 정보를 포함하여** 여기에 기록해야 합니다. 절대로 주문을 임의로 누락하거나 요약해서는 안 됩니다. 모든 주문 기록을 상세히 추출해주세요.",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "time": {"type": "string", "description": "주문 시간 (예: '오전 9:51', '오후 12:02')"},
+                        "customer": {"type": "string", "description": "주문 고객 이름 또는 닉네임 (예: '리리', '삼남매맘S2 8605')"},
+                        "item": {"type": "string", "description": "주문 품목 (예: '프리미엄 우삼겹', '한우나주곰탕')"},
+                        "quantity": {"type": "integer", "description": "주문 수량 (예: 1, 2)"},
+                        "note": {"type": "string", "description": "주문 관련 참고 사항 (예: '현장판매', '월요일 수령', '취소'). 이 필드는 항상 존재해야 하며, 특이사항이 없다면 빈 문자열 \"\"로 표시합니다."}
+                    },
+                    "required": ["time", "customer", "item", "quantity"]
+                }
+            },
+            "item_based_summary": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "item": {"type": "string", "description": "품목명"},
+                        "total_quantity": {"type": "integer", "description": "총 주문 수량"},
+                        "customers": {"type": "string", "description": "해당 품목 주문자 목록 (콤마로 구분)"}
+                    },
+                    "required": ["item", "total_quantity", "customers"]
+                }
+            },
+            "customer_based_orders": {
+                "type": "array",
+                "description": "고객별로 그룹화된 주문 내역입니다. 각 고객이 주문한 모든 품목과 수량을 상세하게 기록해야 합니다. `time_based_orders`에서 추출된 모든 주문 정보를 바탕으로, 고객 기준으로 재구성하여 **누락 없이 모든 주문을 포함해야 합니다**.",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "customer": {"type": "string", "description": "주문자 이름 또는 ID"},
+                        "item": {"type": "string", "description": "주문 품목명"},
+                        "quantity": {"type": "integer", "description": "주문 수량"},
+                        "note": {"type": "string", "description": "추가 메모 또는 비고. 이 필드는 항상 존재해야 하며, 특이사항이 없다면 빈 문자열 \"\"로 표시합니다."}
+                    },
+                    "required": ["customer", "item", "quantity", "note"]
+                }
+            },
+            "order_pattern_analysis": {
+                "type": "object",
+                "description": "주문 패턴 분석 결과입니다. 대화 내용 전체를 바탕으로 분석해야 합니다.",
+                "properties": {
+                    "peak_hours": {"type": "array", "items": {"type": "string"}, "description": "주문이 가장 많았던 시간대 (예: ['오후 12:00-13:00', '오후 9:00-10:00'])"},
+                    "popular_items": {"type": "array", "items": {"type": "string"}, "description": "가장 인기 있었던 품목 (판매량 순, 최대 5개)"},
+                    "sold_out_items": {"type": "array", "items": {"type": "string"}, "description": "품절된 품목 목록"}
+                },
+                "required": ["peak_hours", "popular_items", "sold_out_items"]
+            }
+        },
+        "required": ["time_based_orders", "customer_based_orders", "order_pattern_analysis"]
+    }
+}]
+
 def analyze_conversation_chunk(conversation_chunk: str, shop_name: Optional[str] = None, product_list_for_llm: Optional[Set[str]] = None) -> Dict[str, Any]:
     """
     단일 대화 청크를 분석합니다. (메인 호출: thinking 모드, JSON 직접 반환 요청)
@@ -237,96 +329,29 @@ def analyze_conversation_chunk(conversation_chunk: str, shop_name: Optional[str]
             # 여기서는 get_available_products 또는 extract_product_info 중 하나를 선택하거나 조합하여 사용합니다.
             # 일관성을 위해 analyze_conversation과 유사한 로직을 따릅니다.
             from services.product_service import get_available_products, extract_product_info
-            temp_product_info_dict = extract_product_info(conversation_chunk)
-            temp_all_product_names = set()
-            if isinstance(temp_product_info_dict, dict) and "products" in temp_product_info_dict and isinstance(temp_product_info_dict["products"], list):
-                for product_detail in temp_product_info_dict["products"]:
-                    if isinstance(product_detail, dict) and "name" in product_detail:
-                        temp_all_product_names.add(product_detail["name"])
+            temp_all_product_names = _collect_product_names(extract_product_info(conversation_chunk))
             
             if not temp_all_product_names: # extract_product_info 결과가 없다면 get_available_products 사용
                  temp_all_product_names = get_available_products(conversation_chunk)
             product_list_for_llm = temp_all_product_names
         
-        print(f"LLM에 전달될 상품 목록 (analyze_conversation_chunk): {len(product_list_for_llm)}개")
+        logger.info("LLM에 전달될 상품 목록 (analyze_conversation_chunk): %d개", len(product_list_for_llm))
         
         # 메인 호출용 시스템 프롬프트 (JSON 직접 반환 유도)
         system_prompt = _create_system_prompt(shop_name)
         # 메인 호출용 사용자 프롬프트
         user_prompt = _create_user_prompt(conversation_chunk, product_list_for_llm, for_main_call=True)
         
-        print(f"Claude API 호출 준비 (메인 분석, 대화 길이: {len(conversation_chunk)} 자)")
+        logger.info("Claude API 호출 준비 (메인 분석, 대화 길이: %d 자)", len(conversation_chunk))
         model_name = "claude-3-7-sonnet-20250219"
-        print(f"사용 모델: {model_name}")
+        logger.info("사용 모델: %s", model_name)
         
-        # 대체 호출에서 사용할 도구 정의
-        tools_definition_for_fallback = [{
-            "name": "extract_order_info",
-            "description": "카카오톡 대화에서 주문 정보 및 패턴 분석 결과 추출",
-            "input_schema": {
-                "type": "object",
-                "properties": {
-                    "time_based_orders": {
-                        "type": "array",
-                        "description": "시간 순서대로 정렬된 개별 주문 내역입니다. 대화에서 언급된 모든 주문을 **하나도 빠짐없이, 가능한 모든 정보를 포함하여** 여기에 기록해야 합니다. 절대로 주문을 임의로 누락하거나 요약해서는 안 됩니다. 모든 주문 기록을 상세히 추출해주세요.",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "time": {"type": "string", "description": "주문 시간 (예: '오전 9:51', '오후 12:02')"},
-                                "customer": {"type": "string", "description": "주문 고객 이름 또는 닉네임 (예: '리리', '삼남매맘S2 8605')"},
-                                "item": {"type": "string", "description": "주문 품목 (예: '프리미엄 우삼겹', '한우나주곰탕')"},
-                                "quantity": {"type": "integer", "description": "주문 수량 (예: 1, 2)"},
-                                "note": {"type": "string", "description": "주문 관련 참고 사항 (예: '현장판매', '월요일 수령', '취소'). 이 필드는 항상 존재해야 하며, 특이사항이 없다면 빈 문자열 \"\"로 표시합니다."}
-                            },
-                            "required": ["time", "customer", "item", "quantity"]
-                        }
-                    },
-                    "item_based_summary": {
-                        "type": "array",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "item": {"type": "string", "description": "품목명"},
-                                "total_quantity": {"type": "integer", "description": "총 주문 수량"},
-                                "customers": {"type": "string", "description": "해당 품목 주문자 목록 (콤마로 구분)"}
-                            },
-                            "required": ["item", "total_quantity", "customers"]
-                        }
-                    },
-                    "customer_based_orders": {
-                        "type": "array",
-                        "description": "고객별로 그룹화된 주문 내역입니다. 각 고객이 주문한 모든 품목과 수량을 상세하게 기록해야 합니다. `time_based_orders`에서 추출된 모든 주문 정보를 바탕으로, 고객 기준으로 재구성하여 **누락 없이 모든 주문을 포함해야 합니다**.",
-                        "items": {
-                            "type": "object",
-                            "properties": {
-                                "customer": {"type": "string", "description": "주문자 이름 또는 ID"},
-                                "item": {"type": "string", "description": "주문 품목명"},
-                                "quantity": {"type": "integer", "description": "주문 수량"},
-                                "note": {"type": "string", "description": "추가 메모 또는 비고. 이 필드는 항상 존재해야 하며, 특이사항이 없다면 빈 문자열 \"\"로 표시합니다."}
-                            },
-                            "required": ["customer", "item", "quantity", "note"]
-                        }
-                    },
-                    "order_pattern_analysis": {
-                        "type": "object",
-                        "description": "주문 패턴 분석 결과입니다. 대화 내용 전체를 바탕으로 분석해야 합니다.",
-                        "properties": {
-                            "peak_hours": {"type": "array", "items": {"type": "string"}, "description": "주문이 가장 많았던 시간대 (예: ['오후 12:00-13:00', '오후 9:00-10:00'])"},
-                            "popular_items": {"type": "array", "items": {"type": "string"}, "description": "가장 인기 있었던 품목 (판매량 순, 최대 5개)"},
-                            "sold_out_items": {"type": "array", "items": {"type": "string"}, "description": "품절된 품목 목록"}
-                        },
-                        "required": ["peak_hours", "popular_items", "sold_out_items"]
-                    }
-                },
-                "required": ["time_based_orders", "customer_based_orders", "order_pattern_analysis"]
-            }
-        }]
 
         try:
-            print("스트리밍 모드로 API 호출 시작 (메인 분석 - thinking 모드, JSON 직접 반환)...")
+            logger.info("스트리밍 모드로 API 호출 시작 (메인 분석 - thinking 모드, JSON 직접 반환)...")
             # client.messages.create 대신 client.beta.messages.create 사용
             # betas 파라미터 추가
-            stream_response = client.beta.messages.create(
+            full_text_response, chunk_counter = _stream_main_analysis_text(
                 model=model_name,
                 max_tokens=128000, # 이제 128K 사용 가능
                 system=system_prompt,
@@ -341,98 +366,128 @@ def analyze_conversation_chunk(conversation_chunk: str, shop_name: Optional[str]
                 ],
                 betas=["output-128k-2025-02-19"] # 확장 출력 베타 기능 활성화
             )
-            
-            print("스트리밍 응답 처리 중 (메인 분석)...")
-            full_text_response = ""
-            chunk_counter = 0
-            
-            for chunk in stream_response:
-                chunk_counter += 1
-                try:
-                    if chunk.type == 'content_block_delta' and hasattr(chunk.delta, 'text'):
-                        full_text_response += chunk.delta.text
-                    # ignore other chunk types for logging
-                except Exception:
-                    pass
 
-            print(f"총 {chunk_counter}개 청크 처리 완료 (메인 분석)")
-            logging.info(f"총 {chunk_counter}개 청크 처리 완료 (메인 분석)")
+            logger.info("총 %d개 청크 처리 완료 (메인 분석)", chunk_counter)
 
             if full_text_response:
-                print("메인 분석 결과 (텍스트)에서 JSON 추출 시도 중...")
-                logging.info("메인 분석 결과 (텍스트)에서 JSON 추출 시도 중...")
+                logger.info("메인 분석 결과 (텍스트)에서 JSON 추출 시도 중...")
                 extracted_json_result = _extract_json_from_text(full_text_response)
                 
                 if extracted_json_result:
-                    print("메인 분석: 텍스트에서 JSON 추출 성공.")
-                    logging.info("메인 분석: 텍스트에서 JSON 추출 성공.")
-                    log_file_path = _save_api_response_to_file(json.dumps(extracted_json_result, ensure_ascii=False), f"{shop_name}_main_direct_json")
-                    print(f"API 응답 (메인 분석 JSON)이 {log_file_path} 파일에 저장되었습니다.")
+                    logger.info("메인 분석: 텍스트에서 JSON 추출 성공.")
+                    log_file_path = _save_api_response_to_file(extracted_json_result, f"{shop_name}_main_direct_json")
+                    logger.info("API 응답 (메인 분석 JSON)이 %s 파일에 저장되었습니다.", log_file_path)
                     return _validate_and_process_result(extracted_json_result, conversation_chunk)
                 else:
-                    print("메인 분석: 텍스트에서 유효한 JSON을 추출하지 못했습니다.")
-                    logging.warning("메인 분석: 텍스트에서 유효한 JSON을 추출하지 못했습니다.")
+                    logger.warning("메인 분석: 텍스트에서 유효한 JSON을 추출하지 못했습니다.")
             else:
-                print("메인 분석: LLM으로부터 어떠한 텍스트 응답도 받지 못했습니다.")
-                logging.warning("메인 분석: LLM으로부터 어떠한 텍스트 응답도 받지 못했습니다.")
+                logger.warning("메인 분석: LLM으로부터 어떠한 텍스트 응답도 받지 못했습니다.")
 
-            print("메인 분석에서 유효한 JSON 결과를 얻지 못함, 대체 호출 시도")
-            logging.warning("메인 분석에서 유효한 JSON 결과를 얻지 못함, 대체 호출 시도")
+            logger.warning("메인 분석에서 유효한 JSON 결과를 얻지 못함, 대체 호출 시도")
             return _fallback_process_with_threading(
                 conversation_chunk=conversation_chunk,
                 shop_name=shop_name,
                 original_user_prompt_for_fallback=user_prompt, # 메인 시도에서 사용된 user_prompt
-                tools_for_fallback=tools_definition_for_fallback,
+                tools_for_fallback=_ORDER_EXTRACTION_TOOLS,
                 available_products=product_list_for_llm # 변경된 변수명 사용
             )
 
         except anthropic.APIError as e:
             error_trace = traceback.format_exc()
             error_message = f"Anthropic API 오류 발생 (메인 분석): {str(e)}"
-            print(error_message); logging.error(error_message)
-            print(f"Traceback: {error_trace}"); logging.error(f"Traceback: {error_trace}")
-            print("메인 분석 API 오류, 대체 호출(스레딩)로 재시도합니다.")
-            logging.warning("메인 분석 API 오류, 대체 호출(스레딩)로 재시도합니다.")
+            logger.error(error_message)
+            logger.error("Traceback: %s", error_trace)
+            logger.warning("메인 분석 API 오류, 대체 호출(스레딩)로 재시도합니다.")
             return _fallback_process_with_threading(
                 conversation_chunk=conversation_chunk, shop_name=shop_name,
                 original_user_prompt_for_fallback=user_prompt,
-                tools_for_fallback=tools_definition_for_fallback,
+                tools_for_fallback=_ORDER_EXTRACTION_TOOLS,
                 available_products=product_list_for_llm # 변경된 변수명 사용
             )
         except Exception as e:
             error_trace = traceback.format_exc()
             error_message = f"메인 분석 API 호출 중 일반 오류 발생: {str(e)}"
-            print(error_message); logging.error(error_message)
-            print(f"Traceback: {error_trace}"); logging.error(f"Traceback: {error_trace}")
-            print("메인 분석 일반 오류, 대체 호출(스레딩)로 재시도합니다.")
-            logging.warning("메인 분석 일반 오류, 대체 호출(스레딩)로 재시도합니다.")
+            logger.error(error_message)
+            logger.error("Traceback: %s", error_trace)
+            logger.warning("메인 분석 일반 오류, 대체 호출(스레딩)로 재시도합니다.")
             return _fallback_process_with_threading(
                 conversation_chunk=conversation_chunk, shop_name=shop_name,
                 original_user_prompt_for_fallback=user_prompt,
-                tools_for_fallback=tools_definition_for_fallback,
+                tools_for_fallback=_ORDER_EXTRACTION_TOOLS,
                 available_products=product_list_for_llm # 변경된 변수명 사용
             )
             
     except Exception as e:
         error_trace = traceback.format_exc()
         error_message = f"메인 분석 과정 중 예상치 못한 오류 발생: {str(e)}"
-        print(error_message); logging.error(error_message)
-        print(f"Traceback: {error_trace}"); logging.error(f"Traceback: {error_trace}")
+        logger.error(error_message)
+        logger.error("Traceback: %s", error_trace)
         return {"error": True, "message": error_message, "error_type": "UNEXPECTED_ANALYSIS_ERROR", "traceback": error_trace, "timestamp": datetime.now().isoformat()}
 
-def _create_system_prompt(shop_name: Optional[str] = None) -> str:
+def _is_retryable_stream_error(error: anthropic.APIError) -> bool:
     """
-    시스템 프롬프트를 생성합니다. (메인 분석용 - JSON 직접 반환 요청)
-    LLM에게는 시간순 주문(time_based_orders), 고객별 주문(customer_based_orders), 
-    그리고 주문 패턴 분석(order_pattern_analysis)만 요청합니다.
+    스트림 처리 중 발생한 API 오류가 재시도할 만한 일시적 오류인지 확인합니다.
     
     Args:
-        shop_name (str, optional): 상점 이름
+        error: 스트림 처리 중 발생한 API 오류
         
     Returns:
-        str: 시스템 프롬프트
+        연결 오류, 429/5xx 응답, 과부하 등 일시적 오류 이벤트이면 True
+    """
+    if isinstance(error, anthropic.APIConnectionError):
+        return True
+    if isinstance(error, anthropic.APIStatusError):
+        if error.status_code == 429 or error.status_code >= 500:
+            return True
+        body = error.body if isinstance(error.body, dict) else {}
+        error_info = body.get("error")
+        return isinstance(error_info, dict) and error_info.get("type") in _RETRYABLE_STREAM_ERROR_TYPES
+    return False
+
+def _stream_main_analysis_text(**create_kwargs: Any) -> Tuple[str, int]:
+    """
+    메인 분석 스트리밍 호출을 수행하고 텍스트 응답을 모읍니다.
+    스트림 도중 일시적 오류로 끊기면 지수 백오프 후 호출을 처음부터 다시 요청합니다.
+    
+    Args:
+        create_kwargs: client.beta.messages.create에 전달할 인자
+        
+    Returns:
+        (전체 텍스트 응답, 처리한 스트림 이벤트 수)
     """
-    prompt = """
+    for attempt in range(1, _STREAM_MAX_ATTEMPTS + 1):
+        # 스트리밍 텍스트 조각은 리스트에 모았다가 마지막에 한 번에 합침 (문자열 += 반복 방지)
+        text_parts = []
+        chunk_counter = 0
+        
+        with _api_call_semaphore:
+            stream_response = client.beta.messages.create(**create_kwargs)
+            
+            logger.info("스트리밍 응답 처리 중 (메인 분석)...")
+            try:
+                for chunk in stream_response:
+                    chunk_counter += 1
+                    # 이벤트/델타 타입 문자열로 바로 분기 (thinking/signature 델타 등 나머지는 무시)
+                    if chunk.type == 'content_block_delta' and chunk.delta.type == 'text_delta':
+                        text_parts.append(chunk.delta.text)
+            except anthropic.APIError as e:
+                stream_response.close()
+                if attempt == _STREAM_MAX_ATTEMPTS or not _is_retryable_stream_error(e):
+                    raise
+                error_name = type(e).__name__
+            else:
+                return "".join(text_parts), chunk_counter
+        
+        # 백오프 대기는 호출 슬롯을 반납한 뒤에 수행
+        delay = _STREAM_BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)) + random.random()
+        logger.warning(
+            "메인 분석 스트림 도중 일시적 오류 (%d/%d회차, %s), %.1f초 후 재시도합니다.",
+            attempt, _STREAM_MAX_ATTEMPTS, error_name, delay
+        )
+        time.sleep(delay)
+
+# 메인 분석용 시스템 프롬프트 (상점 이름을 제외한 고정 부분)
+_MAIN_SYSTEM_PROMPT = """
 당신은 카카오톡 대화에서 주문 정보를 추출하여 지정된 JSON 형식으로 반환하는 데이터 분석 전문가입니다.
 유저가 제공한 대화 내용을 분석하여 **시간순 주문 내역**, **고객별 주문 내역**, 그리고 **주문 패턴**을 정확하게 추출하여 다음 JSON 구조에 맞춰 응답을 생성해야 합니다.
 응답은 반드시 JSON 객체만으로 구성되어야 하며, 다른 설명이나 텍스트를 포함해서는 안 됩니다.
@@ -488,10 +543,47 @@ def _create_system_prompt(shop_name: Optional[str] = None) -> str:
 
 최대한 많은 정보를 추출하되, 어떤 경우에도 지정된 JSON 스키마와 위의 상세 지시사항을 엄격히 준수하여 응답해야 합니다.
 """
+
+def _create_system_prompt(shop_name: Optional[str] = None) -> str:
+    """
+    시스템 프롬프트를 생성합니다. (메인 분석용 - JSON 직접 반환 요청)
+    LLM에게는 시간순 주문(time_based_orders), 고객별 주문(customer_based_orders), 
+    그리고 주문 패턴 분석(order_pattern_analysis)만 요청합니다.
+    
+    Args:
+        shop_name (str, optional): 상점 이름
+        
+    Returns:
+        str: 시스템 프롬프트
+    """
+    prompt = _MAIN_SYSTEM_PROMPT
     if shop_name:
         prompt += f"\n분석 중인 대화는 '{shop_name}' 관련 내용입니다."
     return prompt
 
+# 사용자 프롬프트 템플릿과 고정 문구
+_USER_PROMPT_TEMPLATE = """
+아래 전처리된 카카오톡 대화 내용을 분석하여 주문 정보를 추출해주세요.
+대화에서 누가, 무엇을, 얼마나 주문했는지 정확하게 파악해 주세요.
+{product_list_text}
+
+{product_guide}
+{tool_instruction}
+
+===== 전처리된 대화 내용 =====
+{preprocessed_text}
+===================
+"""
+
+_PRODUCT_LIST_HEADER = "\n\n추출된 상품 목록 (이 목록을 기준으로 주문 품목명을 정확히 식별해주세요):\n"
+
+_PRODUCT_GUIDE = (
+    "위 '추출된 상품 목록'을 반드시 참고하여 주문 정보를 추출해주세요. 대화에서 언급된 주문 품목명은 위 목록에 있는 정확한 상품명으로 기록해야 합니다.\n"
+    "예를 들어, 대화에서 '김치'라고 언급되었고 상품 목록에 '배추김치'가 있다면, 주문 품목은 '배추김치'로 기록해야 합니다.\n"
+)
+
+_TOOL_INSTRUCTION = "반드시 extract_order_info 도구를 사용하여 응답해주세요. 일반 텍스트나 마크다운으로 응답하지 마세요."
+
 def _create_user_prompt(preprocessed_text: str, product_list_for_llm: Optional[Set[str]] = None, for_main_call: bool = True) -> str:
     """
     사용자 프롬프트를 생성합니다.
@@ -506,37 +598,99 @@ def _create_user_prompt(preprocessed_text: str, product_list_for_llm: Optional[S
         str: 사용자 프롬프트
     """
     product_list_text = ""
-    if product_list_for_llm and len(product_list_for_llm) > 0:
-        product_list = sorted(list(product_list_for_llm))
-        product_list_text = "\n\n추출된 상품 목록 (이 목록을 기준으로 주문 품목명을 정확히 식별해주세요):\n" + "\n".join([f"- {product}" for product in product_list])
-
     product_guide = ""
-    if product_list_text:
-        product_guide = (
-            "위 '추출된 상품 목록'을 반드시 참고하여 주문 정보를 추출해주세요. 대화에서 언급된 주문 품목명은 위 목록에 있는 정확한 상품명으로 기록해야 합니다.\n"
-            "예를 들어, 대화에서 '김치'라고 언급되었고 상품 목록에 '배추김치'가 있다면, 주문 품목은 '배추김치'로 기록해야 합니다.\n"
-        )
+    if product_list_for_llm:
+        product_list_text = _PRODUCT_LIST_HEADER + "\n".join([f"- {product}" for product in sorted(product_list_for_llm)])
+        product_guide = _PRODUCT_GUIDE
+    
+    # 이 부분은 현재 로직에서는 대체 호출 시에도 시스템 프롬프트가 도구 사용을 강제하므로,
+    # 사용자 프롬프트에서는 명시적인 도구 지시가 필수는 아닐 수 있습니다.
+    # 필요에 따라 `_fallback_process_with_threading`에서 사용자 프롬프트를 만들 때 조절 가능.
+    tool_instruction = "" if for_main_call else _TOOL_INSTRUCTION
+
+    return _USER_PROMPT_TEMPLATE.format(
+        product_list_text=product_list_text,
+        product_guide=product_guide,
+        tool_instruction=tool_instruction,
+        preprocessed_text=preprocessed_text
+    )
+
+def _empty_analysis_result() -> Dict[str, Any]:
+    """
+    모든 필수 필드가 빈 값으로 채워진 분석 결과 골격을 생성합니다.
     
-    tool_instruction = ""
-    if not for_main_call:
-        # 이 부분은 현재 로직에서는 대체 호출 시에도 시스템 프롬프트가 도구 사용을 강제하므로,
-        # 사용자 프롬프트에서는 명시적인 도구 지시가 필수는 아닐 수 있습니다.
-        # 필요에 따라 `_fallback_process_with_threading`에서 사용자 프롬프트를 만들 때 조절 가능.
-        tool_instruction = "반드시 extract_order_info 도구를 사용하여 응답해주세요. 일반 텍스트나 마크다운으로 응답하지 마세요."
+    Returns:
+        dict: 매 호출마다 새로 만든 빈 분석 결과 (호출자가 자유롭게 수정 가능)
+    """
+    return {
+        "time_based_orders": [],
+        "item_based_summary": [],
+        "customer_based_orders": [],
+        "table_summary": {
+            "headers": ["품목", "총수량", "주문자"],
+            "rows": []
+        },
+        "order_pattern_analysis": {
+            "peak_hours": [],
+            "popular_items": [],
+            "sold_out_items": []
+        }
+    }
 
+# 응답 텍스트의 도구 사용 블록 패턴
+_TOOL_USE_PATTERN = re.compile(r'<tool_use name="extract_order_info">([\s\S]*?)</tool_use>')
 
-    return f"""
-아래 전처리된 카카오톡 대화 내용을 분석하여 주문 정보를 추출해주세요.
-대화에서 누가, 무엇을, 얼마나 주문했는지 정확하게 파악해 주세요.
-{product_list_text}
+# 연속 공백 정규화 패턴
+_WHITESPACE_PATTERN = re.compile(r'\s+')
 
-{product_guide}
-{tool_instruction}
+# JSON 마크다운 코드 블록 패턴
+_MARKDOWN_JSON_PATTERN = re.compile(r'```(?:json)?\s*([\s\S]*?)\s*```')
 
-===== 전처리된 대화 내용 =====
-{preprocessed_text}
-===================
-"""
+# 부분 JSON 구성용 섹션 필드와 패턴
+# (세 섹션을 하나의 대안(alternation)으로 묶어 응답을 섹션마다 따로 훑지 않음, 1번 그룹이 섹션 필드)
+_SECTION_FIELDS = ("time_based_orders", "item_based_summary", "customer_based_orders")
+_SECTION_PATTERN = re.compile(r'"(' + '|'.join(_SECTION_FIELDS) + r')"\s*:\s*\[([\s\S]*?)\]')
+
+# 중괄호 스캔용 토큰 패턴 (이스케이프 쌍은 한 토큰으로 건너뛰어 문자열 안의 \" 를 무시)
+_JSON_SCAN_PATTERN = re.compile(r'\\.|["{}]', re.DOTALL)
+
+def _extract_json_spans(text: str) -> List[str]:
+    """
+    텍스트를 한 번만 훑어 모든 최상위 {...} 구간을 찾고, 긴 구간부터 정렬해 반환합니다.
+    JSON 문자열 안의 중괄호는 무시하며, 중첩 깊이에 제한이 없습니다.
+    
+    Args:
+        text (str): 응답 텍스트
+        
+    Returns:
+        List[str]: 균형 잡힌 최상위 중괄호 구간 목록 (길이 내림차순, 길이가 같으면 앞쪽 구간 우선)
+    """
+    depth = 0
+    in_string = False
+    span_start = 0
+    spans = []
+    
+    for token_match in _JSON_SCAN_PATTERN.finditer(text):
+        token = token_match.group()
+        # 객체 밖의 따옴표/이스케이프는 일반 텍스트이므로 무시
+        if depth == 0 and token != '{':
+            continue
+        if token == '"':
+            in_string = not in_string
+        elif in_string or len(token) == 2:
+            continue
+        elif token == '{':
+            if depth == 0:
+                span_start = token_match.start()
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                spans.append((span_start, token_match.end()))
+    
+    # 가장 긴 구간이 파싱되지 않아도 더 짧은 구간의 유효한 객체를 놓치지 않도록 모든 구간을 길이순으로 반환
+    spans.sort(key=lambda span: span[0] - span[1])
+    return [text[start:end] for start, end in spans]
 
 def _extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     """
@@ -548,157 +702,107 @@ def _extract_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     Returns:
         Optional[Dict[str, Any]]: 추출된 JSON 객체 또는 None
     """
-    logging.info("텍스트에서 JSON 추출 시도 중...")
+    logger.info("텍스트에서 JSON 추출 시도 중...")
     
     # 1. 도구 사용 패턴 검색
-    tool_pattern = r'<tool_use name="extract_order_info">([\s\S]*?)</tool_use>'
-    tool_matches = re.findall(tool_pattern, text, re.DOTALL)
+    tool_matches = _TOOL_USE_PATTERN.findall(text)
     
     for match in tool_matches:
+        json_content = match.strip()
+        logger.info("도구 사용 패턴에서 JSON 발견 (길이: %d)", len(json_content))
         try:
-            json_content = match.strip()
-            # 줄바꿈, 탭 등 공백 문자 정리
-            json_content = re.sub(r'\s+', ' ', json_content)
-            logging.info(f"도구 사용 패턴에서 JSON 발견 (길이: {len(json_content)})")
-            return json.loads(json_content)
-        except json.JSONDecodeError:
+            return orjson.loads(json_content)
+        except orjson.JSONDecodeError:
+            pass
+        try:
+            # 파싱에 실패한 경우에만 줄바꿈, 탭 등 공백 문자 정리 후 재시도
+            return orjson.loads(_WHITESPACE_PATTERN.sub(' ', json_content))
+        except orjson.JSONDecodeError:
             try:
                 # 수정 시도
                 fixed_json = _fix_json_string(match)
-                return json.loads(fixed_json)
-            except json.JSONDecodeError:
-                logging.warning("도구 사용 패턴에서 발견된 JSON 파싱 실패")
+                return orjson.loads(fixed_json)
+            except orjson.JSONDecodeError:
+                logger.warning("도구 사용 패턴에서 발견된 JSON 파싱 실패")
                 continue
     
-    # 2. 중괄호로 둘러싸인 부분 찾기 (균형 맞춘 중괄호 검색)
-    logging.info("중괄호 패턴으로 JSON 검색 중...")
-    start_idx = text.find('{')
-    if start_idx != -1:
-        open_count = 0
-        close_count = 0
-        json_text = ""
-        
-        for i in range(start_idx, len(text)):
-            if text[i] == '{':
-                open_count += 1
-            elif text[i] == '}':
-                close_count += 1
-            
-            json_text += text[i]
-            
-            if open_count > 0 and open_count == close_count:
-                # 균형이 맞는 JSON 찾음
-                try:
-                    logging.info(f"균형 잡힌 중괄호 패턴 발견 (길이: {len(json_text)})")
-                    return json.loads(json_text)
-                except json.JSONDecodeError:
-                    # 수정 시도
-                    try:
-                        fixed_json = _fix_json_string(json_text)
-                        logging.info("JSON 수정 후 파싱 시도")
-                        return json.loads(fixed_json)
-                    except json.JSONDecodeError:
-                        logging.warning("균형 잡힌 중괄호에서 발견된 JSON 파싱 실패")
-                
-                # 다음 JSON 객체 찾기 시도
-                next_start = text.find('{', i + 1)
-                if next_start == -1:
-                    break
-                
-                i = next_start - 1
-                open_count = 0
-                close_count = 0
-                json_text = ""
+    # 2. 응답 전체가 JSON 객체인 경우(메인 호출의 일반적인 경우)는 중괄호 스캔 없이 바로 파싱
+    # (이때 가장 긴 최상위 {...} 구간은 응답 전체이므로 아래 스캔 결과와 같음)
+    try:
+        parsed_json = orjson.loads(text)
+    except orjson.JSONDecodeError:
+        parsed_json = None
+    if isinstance(parsed_json, dict):
+        logger.info("응답 전체를 JSON으로 파싱 성공 (길이: %d)", len(text))
+        return parsed_json
     
-    # 3. JSON 마크다운 블록 찾기
-    logging.info("마크다운 코드 블록에서 JSON 검색 중...")
-    json_pattern = r'```(?:json)?\s*([\s\S]*?)\s*```'
-    matches = re.findall(json_pattern, text, re.DOTALL)
+    # 3. 중괄호로 둘러싸인 부분 찾기 (문자열을 인식하는 선형 중괄호 스캔)
+    logger.info("중괄호 패턴으로 JSON 검색 중...")
+    # (긴 구간부터 시도하고, 파싱에 실패하면 다음 구간으로 넘어감)
+    for json_text in _extract_json_spans(text):
+        try:
+            logger.info("균형 잡힌 중괄호 패턴 발견 (길이: %d)", len(json_text))
+            return orjson.loads(json_text)
+        except orjson.JSONDecodeError:
+            # 수정 시도
+            try:
+                fixed_json = _fix_json_string(json_text)
+                logger.info("JSON 수정 후 파싱 시도")
+                return orjson.loads(fixed_json)
+            except orjson.JSONDecodeError:
+                logger.warning("균형 잡힌 중괄호에서 발견된 JSON 파싱 실패")
     
-    for match in matches:
+    # 4. JSON 마크다운 블록 찾기
+    logger.info("마크다운 코드 블록에서 JSON 검색 중...")
+    for match in _MARKDOWN_JSON_PATTERN.findall(text):
         try:
-            logging.info(f"마크다운 블록에서 JSON 발견 (길이: {len(match)})")
-            return json.loads(match)
-        except json.JSONDecodeError:
+            logger.info("마크다운 블록에서 JSON 발견 (길이: %d)", len(match))
+            return orjson.loads(match)
+        except orjson.JSONDecodeError:
             # 수정 시도
             try:
                 fixed_json = _fix_json_string(match)
-                logging.info("마크다운 블록 JSON 수정 후 파싱 시도")
-                return json.loads(fixed_json)
-            except json.JSONDecodeError:
-                logging.warning("마크다운 블록에서 발견된 JSON 파싱 실패")
+                logger.info("마크다운 블록 JSON 수정 후 파싱 시도")
+                return orjson.loads(fixed_json)
+            except orjson.JSONDecodeError:
+                logger.warning("마크다운 블록에서 발견된 JSON 파싱 실패")
                 continue
     
-    # 4. time_based_orders 패턴 검색 (부분 JSON 구성)
-    logging.info("키워드 패턴으로 JSON 구성 시도...")
-    time_based_pattern = r'"time_based_orders"\s*:\s*\[([\s\S]*?)\]'
-    item_based_pattern = r'"item_based_summary"\s*:\s*\[([\s\S]*?)\]'
-    customer_based_pattern = r'"customer_based_orders"\s*:\s*\[([\s\S]*?)\]'
+    # 5. time_based_orders 패턴 검색 (부분 JSON 구성)
+    logger.info("키워드 패턴으로 JSON 구성 시도...")
+    # 결합 패턴을 앞에서부터 한 번 훑으며 섹션별 첫 매칭만 기록
+    # (다음 검색을 매칭 시작 다음 위치에서 이어가므로 섹션별로 따로 검색한 결과와 같음)
+    section_matches = {}
+    pos = 0
+    while len(section_matches) < len(_SECTION_FIELDS):
+        section_match = _SECTION_PATTERN.search(text, pos)
+        if not section_match:
+            break
+        section_matches.setdefault(section_match.group(1), section_match)
+        pos = section_match.start() + 1
     
-    # 패턴이 발견되면 템플릿으로 JSON 구성 시도
-    if re.search(time_based_pattern, text) or re.search(item_based_pattern, text) or re.search(customer_based_pattern, text):
-        try:
-            # 골격 구성
-            template = '''
-            {
-                "time_based_orders": [],
-                "item_based_summary": [],
-                "customer_based_orders": [],
-                "table_summary": {
-                    "headers": ["품목", "총수량", "주문자"],
-                    "rows": []
-                },
-                "order_pattern_analysis": {
-                    "peak_hours": [],
-                    "popular_items": [],
-                    "sold_out_items": []
-                }
-            }
-            '''
-            result = json.loads(template)
-            
-            # 각 섹션 채우기
-            time_match = re.search(time_based_pattern, text)
-            if time_match:
-                time_content = f"[{time_match.group(1)}]"
-                try:
-                    time_data = json.loads(time_content)
-                    result["time_based_orders"] = time_data
-                    logging.info("time_based_orders 섹션 추출 성공")
-                except:
-                    logging.warning("time_based_orders 섹션 파싱 실패")
-            
-            item_match = re.search(item_based_pattern, text)
-            if item_match:
-                item_content = f"[{item_match.group(1)}]"
-                try:
-                    item_data = json.loads(item_content)
-                    result["item_based_summary"] = item_data
-                    logging.info("item_based_summary 섹션 추출 성공")
-                except:
-                    logging.warning("item_based_summary 섹션 파싱 실패")
-                    
-            customer_match = re.search(customer_based_pattern, text)
-            if customer_match:
-                customer_content = f"[{customer_match.group(1)}]"
-                try:
-                    customer_data = json.loads(customer_content)
-                    result["customer_based_orders"] = customer_data
-                    logging.info("customer_based_orders 섹션 추출 성공")
-                except:
-                    logging.warning("customer_based_orders 섹션 파싱 실패")
-            
-            # 섹션 중 하나라도 파싱했으면 결과 반환
-            if (result["time_based_orders"] or result["item_based_summary"] or result["customer_based_orders"]):
-                logging.info("부분 JSON 구성 성공")
-                return result
-                
-        except Exception as e:
-            logging.error(f"부분 JSON 구성 중 오류: {str(e)}")
+    # 패턴이 발견되면 골격 JSON을 구성하고 각 섹션 채우기
+    if section_matches:
+        result = _empty_analysis_result()
+        
+        for field, section_match in section_matches.items():
+            try:
+                result[field] = orjson.loads(f"[{section_match.group(2)}]")
+                logger.info("%s 섹션 추출 성공", field)
+            except orjson.JSONDecodeError:
+                logger.warning("%s 섹션 파싱 실패", field)
+        
+        # 섹션 중 하나라도 파싱했으면 결과 반환
+        if (result["time_based_orders"] or result["item_based_summary"] or result["customer_based_orders"]):
+            logger.info("부분 JSON 구성 성공")
+            return result
     
-    logging.warning("텍스트에서 유효한 JSON을 찾지 못함")
+    logger.warning("텍스트에서 유효한 JSON을 찾지 못함")
     return None
 
+# 이스케이프되지 않은 큰따옴표 (바로 앞 문자가 역슬래시가 아닌 경우)
+_UNESCAPED_QUOTE_PATTERN = re.compile(r'(?<!\\)"')
+
 def _fix_json_string(json_str: str) -> str:
     """
     손상된 JSON 문자열을 수정하려고 시도합니다.
@@ -713,31 +817,26 @@ def _fix_json_string(json_str: str) -> str:
     json_str = json_str.strip()
     
     # 시작과 끝이 중괄호가 아니면 수정
-    if not json_str.startswith('{'):
-        first_brace = json_str.find('{')
-        if first_brace != -1:
-            json_str = json_str[first_brace:]
-    
-    if not json_str.endswith('}'):
-        last_brace = json_str.rfind('}')
-        if last_brace != -1:
-            json_str = json_str[:last_brace+1]
-    
-    # 중복된 중괄호 처리
-    if json_str.count('{') > json_str.count('}'):
-        json_str = json_str + '}' * (json_str.count('{') - json_str.count('}'))
-    elif json_str.count('{') < json_str.count('}'):
-        json_str = '{' * (json_str.count('}') - json_str.count('{')) + json_str
+    first_brace = json_str.find('{')
+    if first_brace > 0:
+        json_str = json_str[first_brace:]
+    
+    last_brace = json_str.rfind('}')
+    if last_brace != -1 and last_brace != len(json_str) - 1:
+        json_str = json_str[:last_brace+1]
+    
+    # 중복된 중괄호 처리 (개수는 한 번씩만 셈)
+    open_count = json_str.count('{')
+    close_count = json_str.count('}')
+    if open_count > close_count:
+        json_str = json_str + '}' * (open_count - close_count)
+    elif open_count < close_count:
+        json_str = '{' * (close_count - open_count) + json_str
     
     # 큰따옴표 짝 맞추기
     if json_str.count('"') % 2 != 0:
-        # 짝이 맞지 않는 따옴표 처리
-        positions = []
-        in_string = False
-        for i, char in enumerate(json_str):
-            if char == '"' and (i == 0 or json_str[i-1] != '\\'):  # 이스케이프되지 않은 따옴표
-                in_string = not in_string
-                positions.append(i)
+        # 짝이 맞지 않는 따옴표 처리 (이스케이프되지 않은 따옴표 위치만 정규식으로 수집)
+        positions = [quote_match.start() for quote_match in _UNESCAPED_QUOTE_PATTERN.finditer(json_str)]
         
         if positions and len(positions) % 2 != 0:
             # 마지막 비정상 따옴표 제거
@@ -746,22 +845,19 @@ def _fix_json_string(json_str: str) -> str:
     # 콤마 오류 수정
     json_str = json_str.replace(',}', '}').replace(',]', ']')
     
-    # 누락된 값 수정
-    json_str = json_str.replace(':"",', ':"",').replace(':""}', ':""}')
+    # 문자열 내의 이스케이프되지 않은 개행문자 수정 (개행이 없으면 생략)
+    if '\n' not in json_str and '\r' not in json_str:
+        return json_str
     
-    # 문자열 내의 이스케이프되지 않은 개행문자 수정
-    in_string = False
-    fixed_str = []
-    for i, char in enumerate(json_str):
-        if char == '"' and (i == 0 or json_str[i-1] != '\\'):
-            in_string = not in_string
-        
-        if in_string and char in ['\n', '\r']:
-            fixed_str.append('\\n')
-        else:
-            fixed_str.append(char)
+    # 이스케이프되지 않은 따옴표로 나누면 홀수 번째 조각이 문자열 내부
+    parts = _UNESCAPED_QUOTE_PATTERN.split(json_str)
+    for i in range(1, len(parts), 2):
+        parts[i] = parts[i].replace('\r', '\\n').replace('\n', '\\n')
     
-    return ''.join(fixed_str)
+    return '"'.join(parts)
+
+# 입력 분할 기준 패턴 (문장 끝 공백 또는 빈 줄)
+_SEGMENT_SPLIT_PATTERN = re.compile(r'(?<=\.)\s+|\n\n+')
 
 def _split_input_text(text: str, max_length: int = 20000) -> List[str]:
     """
@@ -778,40 +874,31 @@ def _split_input_text(text: str, max_length: int = 20000) -> List[str]:
         return [text]
     
     # 문장 또는 문단 단위로 분할
-    segments = re.split(r'(?<=\.)\s+|\n\n+', text)
+    segments = _SEGMENT_SPLIT_PATTERN.split(text)
     
+    # 문자열 += 반복은 이차 시간이 걸리므로 조각을 리스트에 모으고 길이만 따로 누적
     chunks = []
-    current_chunk = ""
+    current_parts = []
+    current_length = 0
     
     for segment in segments:
-        if len(current_chunk) + len(segment) <= max_length:
-            current_chunk += segment + ("\n\n" if segment.endswith('.') else " ")
+        piece = segment + ("\n\n" if segment.endswith('.') else " ")
+        if current_length + len(segment) <= max_length:
+            current_parts.append(piece)
+            current_length += len(piece)
         else:
-            chunks.append(current_chunk.strip())
-            current_chunk = segment + ("\n\n" if segment.endswith('.') else " ")
+            chunks.append("".join(current_parts).strip())
+            current_parts = [piece]
+            current_length = len(piece)
     
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if current_parts:
+        chunks.append("".join(current_parts).strip())
     
-    logging.info(f"입력 텍스트 ({len(text)}자)를 {len(chunks)}개 청크로 분할하였습니다.")
-    print(f"입력 텍스트 ({len(text)}자)를 {len(chunks)}개 청크로 분할하였습니다.")
+    logger.info("입력 텍스트 (%d자)를 %d개 청크로 분할하였습니다.", len(text), len(chunks))
     return chunks
 
-def _fallback_process_with_threading(
-    conversation_chunk: str, 
-    shop_name: Optional[str],
-    original_user_prompt_for_fallback: str, 
-    tools_for_fallback: List[Dict],
-    available_products: Optional[Set[str]] = None
-) -> Dict[str, Any]:
-    """
-    메인 스트리밍 실패 시, 필요한 경우 입력을 청크로 나누어 병렬로 API 호출을 시도합니다.
-    (대체 호출: tool 사용 강제, thinking 미사용)
-    """
-    print("대체 처리 시작 (병렬 가능)...")
-    logging.info("대체 처리 시작 (병렬 가능)...")
-    
-    fallback_system_prompt = f"""
+# 대체 호출용 시스템 프롬프트 (도구 스키마 JSON 직렬화를 모듈 로드 시 한 번만 수행)
+_FALLBACK_SYSTEM_PROMPT = f"""
 당신은 카카오톡 대화에서 주문 정보를 추출하는 데이터 분석 전문가입니다.
 사용자가 제공한 대화 내용을 분석하여 주문 정보를 추출하고, 반드시 'extract_order_info' 도구를 사용하여 JSON 형식으로 결과를 반환해야 합니다.
 절대로 일반 텍스트나 마크다운으로 응답하지 마십시오. 오직 'extract_order_info' 도구만을 사용한 JSON 응답만 허용됩니다.
@@ -820,7 +907,7 @@ def _fallback_process_with_threading(
 1. 제공된 대화에서 모든 주문 관련 정보를 면밀히 분석합니다.
 2. 'extract_order_info' 도구를 사용하여 분석된 정보를 지정된 JSON 스키마에 맞춰 구성합니다.
 3. 응답은 반드시 도구를 통해 그 도구의 'input_schema'에 정의된 JSON 구조로 반환되어야 합니다. (예: <tool_use name="extract_order_info">JSON_데이터</tool_use> 와 유사한 내부적 도구 호출 결과)
-4. JSON 데이터는 도구의 input_schema를 엄격히 준수해야 합니다: {json.dumps(tools_for_fallback[0]["input_schema"], ensure_ascii=False, indent=2)}
+4. JSON 데이터는 도구의 input_schema를 엄격히 준수해야 합니다: {json.dumps(_ORDER_EXTRACTION_TOOLS[0]["input_schema"], ensure_ascii=False, indent=2)}
 5. 어떤 상황에서도 일반 텍스트 응답, 설명, 주석 등을 포함해서는 안 됩니다.
 
 주문 정보 추출 시 다음 사항에 유의하세요:
@@ -834,17 +921,31 @@ def _fallback_process_with_threading(
 
 최대한 많은 정보를 추출하되, 어떤 경우에도 'extract_order_info' 도구를 통해서만 응답하세요.
 """
+
+def _fallback_process_with_threading(
+    conversation_chunk: str, 
+    shop_name: Optional[str],
+    original_user_prompt_for_fallback: str, 
+    tools_for_fallback: List[Dict],
+    available_products: Optional[Set[str]] = None
+) -> Dict[str, Any]:
+    """
+    메인 스트리밍 실패 시, 필요한 경우 입력을 청크로 나누어 병렬로 API 호출을 시도합니다.
+    (대체 호출: tool 사용 강제, thinking 미사용)
+    """
+    logger.info("대체 처리 시작 (병렬 가능)...")
+    
+    fallback_system_prompt = _FALLBACK_SYSTEM_PROMPT
     if shop_name:
         fallback_system_prompt += f"\n분석 중인 대화는 '{shop_name}' 관련 내용입니다."
 
     text_to_process_for_fallback = original_user_prompt_for_fallback
 
     if len(text_to_process_for_fallback) > 15000:
-        logging.info(f"대체 처리: 입력 텍스트가 15,000자를 초과 ({len(text_to_process_for_fallback)}자). 분할 및 병렬 처리 시작.")
-        print(f"대체 처리: 입력 텍스트가 15,000자를 초과 ({len(text_to_process_for_fallback)}자). 분할 및 병렬 처리 시작.")
+        logger.info("대체 처리: 입력 텍스트가 15,000자를 초과 (%d자). 분할 및 병렬 처리 시작.", len(text_to_process_for_fallback))
         
         text_chunks_for_fallback = _split_input_text(text_to_process_for_fallback, max_length=15000)
-        logging.info(f"대체 처리: 텍스트가 {len(text_chunks_for_fallback)}개 청크로 분할됨.")
+        logger.info("대체 처리: 텍스트가 %d개 청크로 분할됨.", len(text_chunks_for_fallback))
         
         all_results = []
         with concurrent.futures.ThreadPoolExecutor(max_workers=min(len(text_chunks_for_fallback), 3)) as executor:
@@ -861,32 +962,30 @@ def _fallback_process_with_threading(
                     result = future.result()
                     if result: all_results.append(result)
                 except Exception as exc:
-                    logging.error(f"대체 처리 청크 {chunk_idx} 실행 중 예외: {exc}\n{traceback.format_exc()}")
+                    logger.error("대체 처리 청크 %d 실행 중 예외: %s", chunk_idx, exc, exc_info=True)
 
         if all_results:
-            logging.info(f"대체 처리: {len(all_results)}개 청크 결과 병합 중")
+            logger.info("대체 처리: %d개 청크 결과 병합 중", len(all_results))
             merged_result = _merge_chunk_results(all_results)
-            log_file_path = _save_api_response_to_file(json.dumps(merged_result, ensure_ascii=False), f"{shop_name}_fallback_merged")
-            logging.info(f"대체 처리: 병합된 결과가 {log_file_path} 파일에 저장됨.")
+            log_file_path = _save_api_response_to_file(merged_result, f"{shop_name}_fallback_merged")
+            logger.info("대체 처리: 병합된 결과가 %s 파일에 저장됨.", log_file_path)
             return _validate_and_process_result(merged_result, conversation_chunk)
         else:
-            logging.warning("대체 처리 (병렬): 모든 분할 청크에서 유효한 결과를 얻지 못함. 기본 JSON 구조 생성.")
+            logger.warning("대체 처리 (병렬): 모든 분할 청크에서 유효한 결과를 얻지 못함. 기본 JSON 구조 생성.")
             return _create_default_result(available_products, shop_name)
     else:
-        logging.info(f"대체 처리: 입력 텍스트가 짧음 ({len(text_to_process_for_fallback)}자). 단일 대체 호출 시도.")
-        print(f"대체 처리: 입력 텍스트가 짧음 ({len(text_to_process_for_fallback)}자). 단일 대체 호출 시도.")
+        logger.info("대체 처리: 입력 텍스트가 짧음 (%d자). 단일 대체 호출 시도.", len(text_to_process_for_fallback))
         single_fallback_result = _process_fallback_chunk(
             chunk_text=text_to_process_for_fallback, chunk_index=0, total_chunks=1,
             shop_name=shop_name, system_prompt_for_fallback_chunk=fallback_system_prompt,
             tools_for_fallback_chunk=tools_for_fallback
         )
         if single_fallback_result:
-            log_file_path = _save_api_response_to_file(json.dumps(single_fallback_result, ensure_ascii=False), f"{shop_name}_fallback_single")
-            logging.info(f"대체 처리(단일): 결과가 {log_file_path} 파일에 저장됨.")
+            log_file_path = _save_api_response_to_file(single_fallback_result, f"{shop_name}_fallback_single")
+            logger.info("대체 처리(단일): 결과가 %s 파일에 저장됨.", log_file_path)
             return _validate_and_process_result(single_fallback_result, conversation_chunk)
         else:
-            logging.warning("대체 처리 (단일): 유효한 결과를 얻지 못함. 기본 JSON 구조 생성.")
-            print("대체 처리 (단일): 유효한 결과를 얻지 못함. 기본 JSON 구조 생성.")
+            logger.warning("대체 처리 (단일): 유효한 결과를 얻지 못함. 기본 JSON 구조 생성.")
             return _create_default_result(available_products, shop_name)
     
 def _process_fallback_chunk(
@@ -900,70 +999,86 @@ def _process_fallback_chunk(
     """
     대체 처리 시 개별 청크를 LLM으로 분석합니다. (병렬 실행용, tool 사용 강제)
     """
-    logging.info(f"대체 처리 청크 {chunk_index+1}/{total_chunks} 분석 시작 (길이: {len(chunk_text)}자)")
-    print(f"대체 처리 청크 {chunk_index+1}/{total_chunks} 분석 시작 (길이: {len(chunk_text)}자)")
+    logger.info("대체 처리 청크 %d/%d 분석 시작 (길이: %d자)", chunk_index + 1, total_chunks, len(chunk_text))
     
     result_json_obj = None
-    full_text_content_stream = "" 
+    text_parts = []
     tool_input_json_parts = [] 
     tool_actually_used = False
 
     try:
         # 표준 client.messages.create 사용, thinking 제거, tool_choice 강제, temperature 0.1
-        stream_response = client.messages.create(
-            model="claude-3-7-sonnet-20250219",
-            max_tokens=4096, # 도구 사용 시에는 결과 JSON 크기에 맞춰 적절히 조절
-            system=system_prompt_for_fallback_chunk,
-            temperature=0.1,
-            tools=tools_for_fallback_chunk,
-            tool_choice={"type": "tool", "name": "extract_order_info"},
-            stream=True,
-            messages=[
-                {"role": "user", "content": chunk_text}
-            ]
-        )
+        # 메인 호출과 같은 동시 호출 상한 안에서 요청 및 스트림 소비
+        with _api_call_semaphore:
+            stream_response = client.messages.create(
+                model="claude-3-7-sonnet-20250219",
+                max_tokens=4096, # 도구 사용 시에는 결과 JSON 크기에 맞춰 적절히 조절
+                system=system_prompt_for_fallback_chunk,
+                temperature=0.1,
+                tools=tools_for_fallback_chunk,
+                tool_choice={"type": "tool", "name": "extract_order_info"},
+                stream=True,
+                messages=[
+                    {"role": "user", "content": chunk_text}
+                ]
+            )
 
-        # Removed fallback_stream_chunks file-based logging
+            # 스트리밍 이벤트를 도착하는 대로 소비하여 텍스트/도구 입력 JSON 조각을 모음
+            for chunk in stream_response:
+                if chunk.type == 'content_block_start':
+                    if chunk.content_block.type == 'tool_use':
+                        tool_actually_used = True
+                elif chunk.type == 'content_block_delta':
+                    delta_type = chunk.delta.type
+                    if delta_type == 'input_json_delta':
+                        tool_input_json_parts.append(chunk.delta.partial_json)
+                    elif delta_type == 'text_delta':
+                        text_parts.append(chunk.delta.text)
+        full_text_content_stream = "".join(text_parts)
 
         if tool_actually_used and tool_input_json_parts:
             complete_tool_input_json_str = "".join(tool_input_json_parts)
-            logging.info(f"대체 처리 청크 {chunk_index+1}: 합쳐진 도구 입력 JSON (길이 {len(complete_tool_input_json_str)}): {complete_tool_input_json_str[:300]}...")
+            # 원본 일부를 포함하는 긴 진단 로그는 DEBUG 레벨에서만 출력
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("대체 처리 청크 %d: 합쳐진 도구 입력 JSON (길이 %d): %s...",
+                             chunk_index + 1, len(complete_tool_input_json_str), complete_tool_input_json_str[:300])
             
             # Removed fallback_raw_json file-based logging
 
             try:
-                result_json_obj = json.loads(complete_tool_input_json_str)
-                logging.info(f"대체 처리 청크 {chunk_index+1}: 도구 입력 JSON 파싱 성공.")
-            except json.JSONDecodeError as e_json:
-                logging.error(f"대체 처리 청크 {chunk_index+1}: 도구 입력 JSON 파싱 오류 ({e_json}). 원본: {complete_tool_input_json_str[:500]}")
+                result_json_obj = orjson.loads(complete_tool_input_json_str)
+                logger.info("대체 처리 청크 %d: 도구 입력 JSON 파싱 성공.", chunk_index + 1)
+            except orjson.JSONDecodeError as e_json:
+                logger.error("대체 처리 청크 %d: 도구 입력 JSON 파싱 오류 (%s). 원본: %s",
+                             chunk_index + 1, e_json, complete_tool_input_json_str[:500])
                 try:
                     fixed_json = _fix_json_string(complete_tool_input_json_str)
-                    result_json_obj = json.loads(fixed_json)
-                    logging.info(f"대체 처리 청크 {chunk_index+1}: 수정된 도구 JSON 파싱 성공.")
+                    result_json_obj = orjson.loads(fixed_json)
+                    logger.info("대체 처리 청크 %d: 수정된 도구 JSON 파싱 성공.", chunk_index + 1)
                 except Exception as e_fix:
-                    logging.error(f"대체 처리 청크 {chunk_index+1}: 수정된 도구 JSON 파싱도 실패 ({e_fix}).")
+                    logger.error("대체 처리 청크 %d: 수정된 도구 JSON 파싱도 실패 (%s).", chunk_index + 1, e_fix)
         
         if result_json_obj is None and full_text_content_stream:
-            logging.info(f"대체 처리 청크 {chunk_index+1}: 도구 결과 없고 텍스트 응답 있음, JSON 추출 시도.")
+            logger.info("대체 처리 청크 %d: 도구 결과 없고 텍스트 응답 있음, JSON 추출 시도.", chunk_index + 1)
             result_json_obj = _extract_json_from_text(full_text_content_stream)
             if result_json_obj:
-                 logging.info(f"대체 처리 청크 {chunk_index+1}: 텍스트에서 JSON 추출 성공.")
+                 logger.info("대체 처리 청크 %d: 텍스트에서 JSON 추출 성공.", chunk_index + 1)
             else:
-                 logging.warning(f"대체 처리 청크 {chunk_index+1}: 텍스트에서 JSON 추출 실패.")
+                 logger.warning("대체 처리 청크 %d: 텍스트에서 JSON 추출 실패.", chunk_index + 1)
 
         if result_json_obj:
-            logging.info(f"대체 처리 청크 {chunk_index+1}: 유효한 JSON 결과 추출 성공.")
-            _save_api_response_to_file(json.dumps(result_json_obj, ensure_ascii=False), f"{shop_name}_fallback_chunk_{chunk_index+1}")
+            logger.info("대체 처리 청크 %d: 유효한 JSON 결과 추출 성공.", chunk_index + 1)
+            _save_api_response_to_file(result_json_obj, f"{shop_name}_fallback_chunk_{chunk_index+1}")
             return result_json_obj
         else:
-            logging.warning(f"대체 처리 청크 {chunk_index+1}: 최종적으로 결과 추출 실패.")
+            logger.warning("대체 처리 청크 %d: 최종적으로 결과 추출 실패.", chunk_index + 1)
             return None
 
     except anthropic.APIError as e_api:
-        logging.error(f"대체 처리 청크 {chunk_index+1} Anthropic API 오류: {str(e_api)}\n{traceback.format_exc()}")
+        logger.error("대체 처리 청크 %d Anthropic API 오류: %s", chunk_index + 1, e_api, exc_info=True)
         return None
     except Exception as e_gen:
-        logging.error(f"대체 처리 청크 {chunk_index+1} 분석 중 일반 오류 발생: {str(e_gen)}\n{traceback.format_exc()}")
+        logger.error("대체 처리 청크 %d 분석 중 일반 오류 발생: %s", chunk_index + 1, e_gen, exc_info=True)
         return None
 
 def _create_default_result(available_products: Optional[Set[str]] = None, shop_name: Optional[str] = None) -> Dict[str, Any]:
@@ -977,23 +1092,9 @@ def _create_default_result(available_products: Optional[Set[str]] = None, shop_n
     Returns:
         dict: 기본 결과 구조
     """
-    logging.info("최소 JSON 구조 생성 중")
-    print("최소 JSON 구조 생성 중")
+    logger.info("최소 JSON 구조 생성 중")
     
-    result = {
-        "time_based_orders": [],
-        "item_based_summary": [],
-        "customer_based_orders": [],
-        "table_summary": {
-            "headers": ["품목", "총수량", "주문자"],
-            "rows": []
-        },
-        "order_pattern_analysis": {
-            "peak_hours": [],
-            "popular_items": [],
-            "sold_out_items": []
-        }
-    }
+    result = _empty_analysis_result()
     
     if shop_name:
         result["shop_name"] = shop_name
@@ -1009,6 +1110,18 @@ def _create_default_result(available_products: Optional[Set[str]] = None, shop_n
     
     return result
 
+def _intern_name(name: Any) -> Any:
+    """
+    품목명/주문자명 문자열을 인턴(intern)하여 청크마다 반복되는 같은 이름이 하나의 객체를 공유하도록 합니다.
+    
+    Args:
+        name: 품목명 또는 주문자명 (문자열이 아니면 그대로 반환)
+        
+    Returns:
+        인턴된 문자열 또는 원래 값
+    """
+    return sys.intern(name) if type(name) is str else name
+
 def _merge_chunk_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     여러 청크에서 얻은 결과를 병합합니다.
@@ -1039,11 +1152,13 @@ def _merge_chunk_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
     # item_based_summary 중복 제거 및 통합
     if "item_based_summary" in merged:
         item_dict = {}
+        # 병합 중인 품목의 주문자는 집합으로 누적하고 문자열은 마지막에 한 번만 만듦
+        customer_sets = {}
         for item in merged["item_based_summary"]:
             if "item" not in item or not item["item"]:
                 continue
                 
-            item_name = item["item"]
+            item_name = _intern_name(item["item"])
             if item_name not in item_dict:
                 item_dict[item_name] = item.copy()
             else:
@@ -1067,14 +1182,17 @@ def _merge_chunk_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
                 current_customers = item_dict[item_name].get("customers", "")
                 new_customers = item.get("customers", "")
                 
-                if current_customers and new_customers:
-                    current_set = set(c.strip() for c in current_customers.split(","))
-                    new_set = set(c.strip() for c in new_customers.split(","))
-                    merged_set = current_set.union(new_set)
-                    item_dict[item_name]["customers"] = ", ".join(sorted(list(merged_set)))
+                if item_name in customer_sets and new_customers:
+                    customer_sets[item_name].update(c.strip() for c in new_customers.split(","))
+                elif current_customers and new_customers:
+                    customer_sets[item_name] = set(c.strip() for c in current_customers.split(","))
+                    customer_sets[item_name].update(c.strip() for c in new_customers.split(","))
                 elif new_customers:
                     item_dict[item_name]["customers"] = new_customers
         
+        for item_name, customers in customer_sets.items():
+            item_dict[item_name]["customers"] = ", ".join(sorted(customers))
+        
         merged["item_based_summary"] = list(item_dict.values())
     
     # order_pattern_analysis 병합
@@ -1095,9 +1213,9 @@ def _merge_chunk_results(results: List[Dict[str, Any]]) -> Dict[str, Any]:
             if field in merged["order_pattern_analysis"]:
                 merged["order_pattern_analysis"][field] = list(set(merged["order_pattern_analysis"][field]))
     
-    logging.info(f"청크 결과 병합 완료: time_based_orders={len(merged.get('time_based_orders', []))}, "
-                f"item_based_summary={len(merged.get('item_based_summary', []))}, "
-                f"customer_based_orders={len(merged.get('customer_based_orders', []))}")
+    logger.info("청크 결과 병합 완료: time_based_orders=%d, item_based_summary=%d, customer_based_orders=%d",
+                len(merged.get('time_based_orders', [])), len(merged.get('item_based_summary', [])),
+                len(merged.get('customer_based_orders', [])))
     
     return merged
 
@@ -1114,29 +1232,29 @@ def _validate_and_process_result(result: Dict[str, Any], preprocessed_text: str)
     """
     # LLM 결과에서 필요한 기본 필드 확인 및 초기화
     if not isinstance(result, dict):
-        print("⚠️ 경고: LLM 결과가 유효한 딕셔너리가 아닙니다.")
+        logger.warning("LLM 결과가 유효한 딕셔너리가 아닙니다.")
         result = {}
 
     llm_time_orders = result.get("time_based_orders", [])
     if not isinstance(llm_time_orders, list):
-        print("⚠️ 경고: LLM 결과에서 'time_based_orders'가 유효하지 않습니다.")
+        logger.warning("LLM 결과에서 'time_based_orders'가 유효하지 않습니다.")
         llm_time_orders = []
 
     llm_customer_orders = result.get("customer_based_orders", [])
     if not isinstance(llm_customer_orders, list):
-         print("⚠️ 경고: LLM 결과에서 'customer_based_orders'가 유효하지 않습니다.")
+         logger.warning("LLM 결과에서 'customer_based_orders'가 유효하지 않습니다.")
          llm_customer_orders = []
 
     llm_pattern_analysis = result.get("order_pattern_analysis", {})
     if not isinstance(llm_pattern_analysis, dict):
-         print("⚠️ 경고: LLM 결과에서 'order_pattern_analysis'가 유효하지 않습니다.")
+         logger.warning("LLM 결과에서 'order_pattern_analysis'가 유효하지 않습니다.")
          llm_pattern_analysis = {"peak_hours": [], "popular_items": [], "sold_out_items": []}
 
     # LLM이 생성한 time_based_orders/customer_based_orders 검증 (필요 시)
     # 예: llm_time_orders = filter_invalid_items(llm_time_orders)
     #     llm_customer_orders = filter_invalid_items(llm_customer_orders)
-    print(f"LLM 추출 time_based_orders: {len(llm_time_orders)}개 주문")
-    print(f"LLM 추출 customer_based_orders: {len(llm_customer_orders)}개 주문 (고객별 상세)")
+    logger.info("LLM 추출 time_based_orders: %d개 주문", len(llm_time_orders))
+    logger.info("LLM 추출 customer_based_orders: %d개 주문 (고객별 상세)", len(llm_customer_orders))
 
     # time_based_orders를 기반으로 item/table 요약 정보 생성
     generated_summaries = _generate_item_and_table_summaries(llm_time_orders)
@@ -1151,26 +1269,46 @@ def _validate_and_process_result(result: Dict[str, Any], preprocessed_text: str)
     }
 
     # 결과 요약 로그 출력
-    print(f"코드 생성 item_based_summary: {len(final_result.get('item_based_summary', []))}개 품목")
-    print(f"코드 생성 table_summary: {len(final_result.get('table_summary', {}).get('rows', []))}개 행")
+    logger.info("코드 생성 item_based_summary: %d개 품목", len(final_result.get('item_based_summary', [])))
+    logger.info("코드 생성 table_summary: %d개 행", len(final_result.get('table_summary', {}).get('rows', [])))
 
     # 주문 패턴 분석 검증 (기존 로직 활용 또는 수정)
-    if "order_pattern_analysis" in final_result and isinstance(final_result["order_pattern_analysis"], dict):
-        if "sold_out_items" in final_result["order_pattern_analysis"] and isinstance(final_result["order_pattern_analysis"]["sold_out_items"], list):
-            original_count = len(final_result["order_pattern_analysis"]["sold_out_items"])
-            final_result["order_pattern_analysis"]["sold_out_items"] = [
-                item for item in final_result["order_pattern_analysis"]["sold_out_items"]
-                if isinstance(item, str) and is_valid_item_name(item)
-            ]
-            filtered_count = original_count - len(final_result["order_pattern_analysis"]["sold_out_items"])
-            if filtered_count > 0:
-                print(f"sold_out_items에서 {filtered_count}개의 잘못된 품목이 필터링되었습니다.")
+    # (llm_pattern_analysis는 위에서 dict로 보장됨)
+    sold_out_items = llm_pattern_analysis.get("sold_out_items")
+    if isinstance(sold_out_items, list):
+        filtered_sold_out_items = [
+            item for item in sold_out_items
+            if isinstance(item, str) and is_valid_item_name(item)
+        ]
+        llm_pattern_analysis["sold_out_items"] = filtered_sold_out_items
+        filtered_count = len(sold_out_items) - len(filtered_sold_out_items)
+        if filtered_count > 0:
+            logger.info("sold_out_items에서 %d개의 잘못된 품목이 필터링되었습니다.", filtered_count)
 
     # 빈 배열/데이터 확인 로그 (선택 사항)
     # ... (기존과 유사하게 필요한 검사 추가) ...
     
     return final_result
 
+def _safe_quantity(value: Any) -> int:
+    """
+    주문 수량을 정수로 변환합니다 (천 단위 쉼표 허용, 변환 실패 시 0).
+    
+    Args:
+        value: 주문 수량 (정수 또는 문자열)
+        
+    Returns:
+        int: 변환된 수량
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        try:
+            return int(value.replace(',', ''))
+        except ValueError:
+            return 0
+    return 0
+
 def _generate_item_and_table_summaries(time_based_orders: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
     time_based_orders 데이터를 기반으로 item_based_summary와 table_summary를 생성합니다.
@@ -1182,50 +1320,38 @@ def _generate_item_and_table_summaries(time_based_orders: List[Dict[str, Any]])
     Returns:
         생성된 item_based_summary와 table_summary를 담은 딕셔너리
     """
-    item_summary_data = defaultdict(lambda: {'total_quantity': 0, 'customers': set()})
-
-    # 수량 타입 변환 함수 (오류 처리 포함)
-    def safe_int(value):
-        if isinstance(value, int):
-            return value
-        if isinstance(value, str):
-            try:
-                return int(value.replace(',', ''))
-            except ValueError:
-                return 0
-        return 0
+    # 품목별 총수량과 주문자 집합을 병렬 딕셔너리로 관리 (품목마다 작은 dict를 만들지 않음)
+    item_total_quantities = defaultdict(int)
+    item_customers = defaultdict(set)
 
     # 1. 데이터 집계 (item_based_summary 준비)
     for order in time_based_orders:
         item_name = order.get('item')
         customer_name = order.get('customer')
-        quantity = safe_int(order.get('quantity', 0))
+        quantity = _safe_quantity(order.get('quantity', 0))
 
         if not item_name or not customer_name or quantity <= 0:
             continue
+        item_name = _intern_name(item_name)
+        customer_name = _intern_name(customer_name)
 
         # 품목별 요약 데이터 업데이트
-        item_summary_data[item_name]['total_quantity'] += quantity
-        item_summary_data[item_name]['customers'].add(customer_name)
+        item_total_quantities[item_name] += quantity
+        item_customers[item_name].add(customer_name)
 
-    # 2. item_based_summary 생성
+    # 2. item_based_summary와 3. table_summary 행을 총수량 내림차순으로 한 번에 생성
+    # (집계 결과를 먼저 정렬하므로 요약 dict를 만든 뒤 다시 정렬하지 않음)
     item_based_summary = []
-    for item_name, data in item_summary_data.items():
+    table_summary_rows = []
+    for item_name, total_quantity in sorted(item_total_quantities.items(), key=itemgetter(1), reverse=True):
+        customers = ', '.join(sorted(item_customers[item_name]))
         item_based_summary.append({
             'item': item_name,
-            'total_quantity': data['total_quantity'],
-            'customers': ', '.join(sorted(list(data['customers'])))
+            'total_quantity': total_quantity,
+            'customers': customers
         })
-    item_based_summary = sorted(item_based_summary, key=lambda x: x['total_quantity'], reverse=True)
+        table_summary_rows.append([item_name, str(total_quantity), customers])
 
-    # 3. table_summary 생성
-    table_summary_rows = []
-    for item_data in item_based_summary: # item_based_summary 결과를 사용
-         table_summary_rows.append([
-             item_data['item'],
-             str(item_data['total_quantity']),
-             item_data['customers']
-         ])
     table_summary = {
         'headers': ["품목", "총수량", "주문자"],
         'rows': table_summary_rows
@@ -1,43 +1,88 @@
 import re
 import logging
+from functools import lru_cache
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 결합 정규식의 그룹 이름 -> 통계 항목 이름
+STATISTICS_LABELS = {
+    'enter': '입장 메시지',
+    'exit': '퇴장 메시지',
+    'deleted': '삭제된 메시지',
+    'bot': '봇 메시지',
+    'media': '미디어 메시지',
+    'date_only': '날짜 구분선'
+}
+
+# 연속된 빈 줄 패턴
+_BLANK_LINES_PATTERN = re.compile(r'\n\s*\n')
+
+def _iter_line_spans(text):
+    """
+    텍스트를 줄 단위로 나누지 않고 각 줄의 (시작, 끝) 위치를 순서대로 반환
+    
+    Args:
+        text (str): 줄 경계를 찾을 텍스트
+        
+    Yields:
+        tuple: 줄의 (시작 인덱스, 끝 인덱스), str.split('\\n')과 같은 줄 구분
+    """
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end < 0:
+            yield start, len(text)
+            return
+        yield start, end
+        start = end + 1
+
 class ChatPreprocessor:
     """
     카카오톡 채팅 내용을 전처리하여 분석에 불필요한 메시지를 제거하는 클래스
     """
     
     def __init__(self):
+        # 0. 모든 메시지 줄이 공유하는 타임스탬프 접두사
+        self.timestamp_pattern = r'\d{4}년\s+\d{1,2}월\s+\d{1,2}일\s+(?:오전|오후)\s+\d{1,2}:\d{2}'
+        
+        # 타임스탬프 뒤에 오는 유형별 본문 패턴
+        self.enter_suffix = r'.+님이\s+들어왔습니다\.'
+        self.exit_suffix = r'.+님이\s+나갔습니다\.'
+        self.deleted_suffix = r'.+\s+:\s+삭제된\s+메시지입니다\.'
+        self.bot_suffix = r'오픈채팅봇\s+:\s+.+'
+        self.media_suffix = r'.+\s+:\s+(?:사진(?:\s+\d+장)?|동영상|이모티콘)'
+        
         # 1. 입장 메시지 패턴
-        self.enter_pattern = r'\d{4}년\s+\d{1,2}월\s+\d{1,2}일\s+(?:오전|오후)\s+\d{1,2}:\d{2},\s+.+님이\s+들어왔습니다\.'
+        self.enter_pattern = self.timestamp_pattern + r',\s+' + self.enter_suffix
         
         # 2. 퇴장 메시지 패턴
-        self.exit_pattern = r'\d{4}년\s+\d{1,2}월\s+\d{1,2}일\s+(?:오전|오후)\s+\d{1,2}:\d{2},\s+.+님이\s+나갔습니다\.'
+        self.exit_pattern = self.timestamp_pattern + r',\s+' + self.exit_suffix
         
         # 3. 삭제된 메시지 패턴
-        self.deleted_pattern = r'\d{4}년\s+\d{1,2}월\s+\d{1,2}일\s+(?:오전|오후)\s+\d{1,2}:\d{2},\s+.+\s+:\s+삭제된\s+메시지입니다\.'
+        self.deleted_pattern = self.timestamp_pattern + r',\s+' + self.deleted_suffix
         
         # 4. 봇 메시지 패턴
-        self.bot_pattern = r'\d{4}년\s+\d{1,2}월\s+\d{1,2}일\s+(?:오전|오후)\s+\d{1,2}:\d{2},\s+오픈채팅봇\s+:\s+.+'
+        self.bot_pattern = self.timestamp_pattern + r',\s+' + self.bot_suffix
         
         # 5. 미디어 메시지 패턴 (사진, 동영상, 이모티콘)
-        self.media_pattern = r'\d{4}년\s+\d{1,2}월\s+\d{1,2}일\s+(?:오전|오후)\s+\d{1,2}:\d{2},\s+.+\s+:\s+(?:사진(?:\s+\d+장)?|동영상|이모티콘)'
+        self.media_pattern = self.timestamp_pattern + r',\s+' + self.media_suffix
         
         # 6. 날짜 구분선 패턴 (타임스탬프만 있는 줄)
-        self.date_only_pattern = r'^\d{4}년\s+\d{1,2}월\s+\d{1,2}일\s+(?:오전|오후)\s+\d{1,2}:\d{2}$'
+        self.date_only_pattern = r'^' + self.timestamp_pattern + r'$'
         
         # 모든 패턴을 하나로 결합 (OR 연산)
-        self.all_patterns = '|'.join([
-            self.enter_pattern,
-            self.exit_pattern,
-            self.deleted_pattern,
-            self.bot_pattern,
-            self.media_pattern,
-            self.date_only_pattern
-        ])
+        # 타임스탬프 접두사를 한 번만 매칭하도록 공통 부분을 묶어, 일반 메시지 줄에서
+        # 같은 접두사를 유형별로 여섯 번 다시 검사하지 않게 함
+        # 그룹 이름(lastgroup)으로 어떤 유형에 매칭되었는지 바로 알 수 있음
+        self.all_patterns = self.timestamp_pattern + r'(?:,\s+(?:' + '|'.join([
+            f'(?P<enter>{self.enter_suffix})',
+            f'(?P<exit>{self.exit_suffix})',
+            f'(?P<deleted>{self.deleted_suffix})',
+            f'(?P<bot>{self.bot_suffix})',
+            f'(?P<media>{self.media_suffix})'
+        ]) + r')|(?P<date_only>$))'
         
         # 컴파일된 정규식 (성능 향상을 위해)
         self.compiled_pattern = re.compile(self.all_patterns)
@@ -64,17 +109,21 @@ class ChatPreprocessor:
         Returns:
             str: 불필요한 메시지가 제거된 채팅 텍스트
         """
-        lines = chat_text.split('\n')
+        # 줄 목록을 만들지 않고 원본 문자열 위에서 줄 경계만 따라가며 처리
+        match_line = self.compiled_pattern.match
         filtered_lines = []
-        removed_count = 0
-        
-        for line in lines:
-            if line.strip() and not self.is_unnecessary_message(line):
+        total_count = 0
+        
+        for start, end in _iter_line_spans(chat_text):
+            total_count += 1
+            if match_line(chat_text, start, end):
+                continue
+            line = chat_text[start:end]
+            if line and not line.isspace():
                 filtered_lines.append(line)
-            else:
-                removed_count += 1
         
-        logger.info(f"전체 {len(lines)}줄 중 {removed_count}줄 제거됨 ({removed_count/len(lines)*100:.1f}%)")
+        removed_count = total_count - len(filtered_lines)
+        logger.info("전체 %d줄 중 %d줄 제거됨 (%.1f%%)", total_count, removed_count, removed_count / total_count * 100)
         
         return '\n'.join(filtered_lines)
     
@@ -92,7 +141,7 @@ class ChatPreprocessor:
         cleaned_text = self.remove_unnecessary_messages(chat_text)
         
         # 2. 연속된 빈 줄 제거
-        cleaned_text = re.sub(r'\n\s*\n', '\n', cleaned_text)
+        cleaned_text = _BLANK_LINES_PATTERN.sub('\n', cleaned_text)
         
         # 3. 텍스트 앞뒤 공백 제거
         cleaned_text = cleaned_text.strip()
@@ -109,7 +158,6 @@ class ChatPreprocessor:
         Returns:
             dict: 각 유형별 불필요한 메시지 수
         """
-        lines = chat_text.split('\n')
         stats = {
             '입장 메시지': 0,
             '퇴장 메시지': 0,
@@ -117,25 +165,29 @@ class ChatPreprocessor:
             '봇 메시지': 0,
             '미디어 메시지': 0,
             '날짜 구분선': 0,
-            '전체 메시지': len(lines)
+            '전체 메시지': chat_text.count('\n') + 1
         }
         
-        for line in lines:
-            if re.match(self.enter_pattern, line):
-                stats['입장 메시지'] += 1
-            elif re.match(self.exit_pattern, line):
-                stats['퇴장 메시지'] += 1
-            elif re.match(self.deleted_pattern, line):
-                stats['삭제된 메시지'] += 1
-            elif re.match(self.bot_pattern, line):
-                stats['봇 메시지'] += 1
-            elif re.match(self.media_pattern, line):
-                stats['미디어 메시지'] += 1
-            elif re.match(self.date_only_pattern, line):
-                stats['날짜 구분선'] += 1
+        # 결합 정규식 한 번의 매칭으로 유형을 판별 (유형별 순차 매칭 없음)
+        # 줄을 잘라내지 않고 원본 문자열의 (시작, 끝) 범위에서 바로 매칭
+        match_line = self.compiled_pattern.match
+        for start, end in _iter_line_spans(chat_text):
+            match = match_line(chat_text, start, end)
+            if match:
+                stats[STATISTICS_LABELS[match.lastgroup]] += 1
         
         return stats
 
+@lru_cache(maxsize=1)
+def get_preprocessor():
+    """
+    공용 ChatPreprocessor 인스턴스를 반환 (정규식 컴파일은 최초 1회만 수행)
+    
+    Returns:
+        ChatPreprocessor: 모듈 전체에서 공유되는 전처리기
+    """
+    return ChatPreprocessor()
+
 # 사용 예시 함수
 def clean_chat(chat_text):
     """
@@ -147,7 +199,7 @@ def clean_chat(chat_text):
     Returns:
         str: 정제된 채팅 텍스트
     """
-    preprocessor = ChatPreprocessor()
+    preprocessor = get_preprocessor()
     stats = preprocessor.get_statistics(chat_text)
     
     # 통계 출력
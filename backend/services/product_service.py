@@ -1,12 +1,17 @@
 import re
 import os
 import json
+import hashlib
+import threading
 import anthropic
 import logging
+from functools import lru_cache
 from typing import List, Dict, Any, Set, Tuple, Optional
 
+from cachetools import LRUCache
+
 from config import ANTHROPIC_API_KEY
-from services.preprocess_chat import ChatPreprocessor
+from services.preprocess_chat import get_preprocessor
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,7 +21,7 @@ logger = logging.getLogger(__name__)
 client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
 
 # 채팅 전처리기 초기화
-chat_preprocessor = ChatPreprocessor()
+chat_preprocessor = get_preprocessor()
 
 # 유효한 Claude 모델 이름 - 3.7 Sonnet으로 업데이트
 CLAUDE_MODEL = "claude-3-7-sonnet-20250219"  # 개선된 모델 사용
@@ -34,6 +39,57 @@ SELLER_IDENTIFIERS = {
     ]
 }
 
+# 명시적인 판매자 계정 목록 (소문자로 정규화하여 집합으로 보관)
+_EXPLICIT_SELLERS = frozenset(seller.lower() for seller in [
+    "우국상", "신검단", "우국상 신검단", "우국상신검단", 
+    "우국상 신검단중앙역점", "우국상중앙역점",
+    "국민상회", "국민상회 머슴", "국민상회머슴", 
+    "오픈채팅봇", "주문", "판매자"
+])
+
+# 판매자 이름과 키워드를 하나의 정규식 대안(alternation)으로 미리 컴파일
+_SELLER_IDENTIFIER_PATTERN = re.compile("|".join(
+    re.escape(identifier.lower())
+    for identifier in SELLER_IDENTIFIERS["names"] + SELLER_IDENTIFIERS["keywords"]
+))
+
+# 대화 내용 해시(blake2b) -> 상품 정보 추출 결과 캐시 (같은 대화의 재분석/재시도 시 LLM 호출 생략)
+_product_info_cache: Dict[bytes, Dict[str, List[Dict[str, Any]]]] = LRUCache(maxsize=64)
+_product_info_cache_lock = threading.Lock()
+
+# 카카오톡 메시지 시작 줄 패턴 (두 형식을 하나의 대안(alternation)으로 묶어 줄마다 한 번만 매칭)
+# - standard: 현재 카카오톡 내보내기 형식 (그룹 2~4: 날짜시간, 발화자, 내용)
+#   2025년 4월 26일 오후 12:47, 우국상 신검단 : 총수량을 3개 단위로 주문 부탁드려용! 
+# - alt: 기존 형식도 유지 (하위 호환성, 그룹 6~8: 접두어, 발화자, 내용)
+_KAKAO_MESSAGE_PATTERN = re.compile(
+    r'(?P<standard>(\d{4}년\s+\d{1,2}월\s+\d{1,2}일\s+(?:오전|오후)\s+\d{1,2}:\d{2}),\s+([^:]+)\s+:\s+(.+))'
+    r'|(?P<alt>^([^:]+):\s+\d{2},\s+([^:]+)\s+:\s+(.+))'
+)
+
+# 사용자 입/퇴장 문구 (줄의 두 번째 글자 이후 어디든 포함되면 입/퇴장 메시지)
+# 두 문구가 공통 접두어를 공유하므로 접두어를 한 번만 찾고 뒤따르는 접미어로 구분
+_USER_ACTION_PREFIX = "님이 "
+_USER_ACTION_SUFFIXES = ("나갔습니다", "들어왔습니다")
+
+def _is_user_action_line(line: str) -> bool:
+    """
+    사용자 입/퇴장 메시지 줄인지 확인합니다.
+    '.+님이 (나갔습니다|들어왔습니다)' 정규식 매칭과 같은 결과를 역추적 없이 고정 문자열 검색으로 얻습니다.
+    
+    Args:
+        line (str): 줄바꿈이 없는 메시지 줄
+        
+    Returns:
+        bool: 입/퇴장 메시지이면 True
+    """
+    # 문구마다 줄 전체를 따로 훑지 않고, 공통 접두어 위치에서만 접미어를 확인
+    prefix_len = len(_USER_ACTION_PREFIX)
+    pos = line.find(_USER_ACTION_PREFIX, 1)
+    while pos != -1:
+        if line.startswith(_USER_ACTION_SUFFIXES, pos + prefix_len):
+            return True
+        pos = line.find(_USER_ACTION_PREFIX, pos + 1)
+    return False
 
 def extract_seller_messages(conversation_text: str) -> List[str]:
     """
@@ -46,7 +102,6 @@ def extract_seller_messages(conversation_text: str) -> List[str]:
     Returns:
         List[str]: 판매자 메시지 목록
     """
-    lines = conversation_text.split('\n')
     seller_messages = []
     
     current_message = []
@@ -54,50 +109,51 @@ def extract_seller_messages(conversation_text: str) -> List[str]:
     is_seller = False
     date_info = ""
     
-    # 현재 카카오톡 내보내기 형식의 메시지 패턴
-    # 2025년 4월 26일 오후 12:47, 우국상 신검단 : 총수량을 3개 단위로 주문 부탁드려용! 
-    kakao_standard_pattern = r'(\d{4}년\s+\d{1,2}월\s+\d{1,2}일\s+(?:오전|오후)\s+\d{1,2}:\d{2}),\s+([^:]+)\s+:\s+(.+)'
-    
-    # 기존 패턴도 유지 (하위 호환성)
-    kakao_alt_pattern = r'^([^:]+):\s+\d{2},\s+([^:]+)\s+:\s+(.+)'
-    
-    # 사용자 입/퇴장 패턴
-    user_action_pattern = r'.+님이 (나갔습니다|들어왔습니다)'
-    
-    for line in lines:
-        line = line.strip()
+    # 줄 목록 전체를 만들지 않고 원본 문자열의 위치를 옮겨 가며 한 줄씩 처리
+    text_length = len(conversation_text)
+    pos = 0
+    while pos < text_length:
+        if not is_seller:
+            # 판매자 메시지 밖에서는 새 메시지 시작 줄만 결과에 영향을 주며, 두 형식 모두 ':'를 포함함
+            # (연속 줄은 버려지고 입/퇴장 줄도 상태를 바꾸지 않음)
+            # 따라서 ':'가 없는 줄들은 줄 단위로 분류하지 않고 문자열 검색으로 한 번에 건너뜀
+            colon_pos = conversation_text.find(':', pos)
+            if colon_pos == -1:
+                break
+            newline_pos = conversation_text.rfind('\n', pos, colon_pos)
+            if newline_pos != -1:
+                pos = newline_pos + 1
+        
+        line_end = conversation_text.find('\n', pos)
+        if line_end == -1:
+            line_end = text_length
+        line = conversation_text[pos:line_end].strip()
+        pos = line_end + 1
         if not line:
             continue
         
-        # 표준 카카오톡 패턴 확인
-        standard_match = re.match(kakao_standard_pattern, line)
-        alt_match = re.match(kakao_alt_pattern, line)
-        user_action_match = re.match(user_action_pattern, line)
+        # 메시지 시작 줄 확인 (표준/대체 형식을 한 번의 매칭으로 판별, 표준 형식 우선)
+        # 두 형식 모두 ':'가 있어야 하므로, ':'가 없는 연속 줄(상품 안내 본문 등)은 정규식을 실행하지 않음
+        message_match = _KAKAO_MESSAGE_PATTERN.match(line) if ':' in line else None
         
-        if standard_match:
+        if message_match:
             # 이전 메시지 처리
             if current_message and is_seller:
                 seller_messages.append('\n'.join(current_message))
             
             # 새 메시지 처리
-            date_time, speaker, content = standard_match.groups()
-            date_info = date_time
-            current_speaker = speaker
-            is_seller = _is_seller(speaker)
-            current_message = [f"{date_time}, {speaker} : {content}"]
-            
-        elif alt_match:
-            # 이전 메시지 처리
-            if current_message and is_seller:
-                seller_messages.append('\n'.join(current_message))
-            
-            # 새 메시지 처리 (대체 형식)
-            sender_prefix, speaker, content = alt_match.groups()
+            if message_match.lastgroup == 'standard':
+                date_time, speaker, content = message_match.group(2, 3, 4)
+                date_info = date_time
+                current_message = [f"{date_time}, {speaker} : {content}"]
+            else:
+                # 대체 형식
+                sender_prefix, speaker, content = message_match.group(6, 7, 8)
+                current_message = [f"{sender_prefix}: {speaker} : {content}"]
             current_speaker = speaker
             is_seller = _is_seller(speaker)
-            current_message = [f"{sender_prefix}: {speaker} : {content}"]
             
-        elif user_action_match:
+        elif _is_user_action_line(line):
             # 사용자 입/퇴장 메시지 처리
             if current_message and is_seller:
                 seller_messages.append('\n'.join(current_message))
@@ -114,7 +170,7 @@ def extract_seller_messages(conversation_text: str) -> List[str]:
         seller_messages.append('\n'.join(current_message))
     
     # 결과 로깅
-    logger.info(f"총 {len(seller_messages)}개의 판매자 메시지를 추출했습니다.")
+    logger.info("총 %d개의 판매자 메시지를 추출했습니다.", len(seller_messages))
     
     # 중복 메시지 제거
     unique_messages = []
@@ -127,10 +183,11 @@ def extract_seller_messages(conversation_text: str) -> List[str]:
             unique_messages.append(msg)
     
     if len(unique_messages) < len(seller_messages):
-        logger.info(f"{len(seller_messages) - len(unique_messages)}개의 중복 메시지가 제거되었습니다.")
+        logger.info("%d개의 중복 메시지가 제거되었습니다.", len(seller_messages) - len(unique_messages))
     
     return unique_messages
 
+@lru_cache(maxsize=1024)
 def _is_seller(speaker: str) -> bool:
     """
     발화자가 판매자/관리자인지 확인합니다.
@@ -147,32 +204,13 @@ def _is_seller(speaker: str) -> bool:
     # 정규화: 대괄호, 특수문자 제거 및 소문자 변환
     speaker = speaker.strip('[]').lower()
     
-    # 명시적인 판매자 계정 목록
-    explicit_sellers = [
-        "우국상", "신검단", "우국상 신검단", "우국상신검단", 
-        "우국상 신검단중앙역점", "우국상중앙역점",
-        "국민상회", "국민상회 머슴", "국민상회머슴", 
-        "오픈채팅봇", "주문", "판매자"
-    ]
-    
     # 명시적 판매자 계정 확인
-    for seller in explicit_sellers:
-        if seller.lower() == speaker.lower():
-            return True
+    if speaker in _EXPLICIT_SELLERS:
+        return True
     
-    # 이름으로 판매자 확인
-    for name in SELLER_IDENTIFIERS["names"]:
-        if name.lower() in speaker:
-            return True
-    
-    # 키워드로 판매자 확인
-    for keyword in SELLER_IDENTIFIERS["keywords"]:
-        if keyword.lower() in speaker:
-            return True
-    
-    # 주문 패턴 확인 (숫자 4자리로 시작하거나 끝나는 경우는 고객)
-    if re.match(r'^\d{4}', speaker) or re.search(r'\d{4}$', speaker):
-        return False
+    # 이름/키워드로 판매자 확인 (하나의 정규식으로 한 번에 검색)
+    if _SELLER_IDENTIFIER_PATTERN.search(speaker):
+        return True
     
     return False
 
@@ -187,52 +225,41 @@ def get_available_products(conversation_text: str) -> Set[str]:
         Set[str]: 모든 상품명 집합 (품절 포함)
     """
     try:
-        # 0. 불필요한 메시지 제거 (전처리)
+        # 0. 대화 통계 (로그 출력용이므로 INFO 레벨이 꺼져 있으면 계산하지 않음)
         try:
-            logger.info(f"원본 대화 길이: {len(conversation_text)} 문자")
-            stats = chat_preprocessor.get_statistics(conversation_text)
-            
-            logger.info("대화 통계:")
-            logger.info(f"  - 전체 메시지: {stats['전체 메시지']}줄")
-            logger.info(f"  - 입장/퇴장 메시지: {stats['입장 메시지'] + stats['퇴장 메시지']}줄")
-            logger.info(f"  - 삭제된 메시지: {stats['삭제된 메시지']}줄")
-            logger.info(f"  - 미디어 메시지: {stats['미디어 메시지']}줄")
-            
-            # 전처리 실행
-            processed_text = chat_preprocessor.preprocess_chat(conversation_text)
-            logger.info(f"전처리 후 대화 길이: {len(processed_text)} 문자")
+            logger.info("원본 대화 길이: %d 문자", len(conversation_text))
+            if logger.isEnabledFor(logging.INFO):
+                stats = chat_preprocessor.get_statistics(conversation_text)
+                
+                logger.info("대화 통계:")
+                logger.info("  - 전체 메시지: %d줄", stats['전체 메시지'])
+                logger.info("  - 입장/퇴장 메시지: %d줄", stats['입장 메시지'] + stats['퇴장 메시지'])
+                logger.info("  - 삭제된 메시지: %d줄", stats['삭제된 메시지'])
+                logger.info("  - 미디어 메시지: %d줄", stats['미디어 메시지'])
         except Exception as e:
-            logger.warning(f"대화 전처리 중 오류 발생: {str(e)}")
-            logger.warning("원본 대화로 계속 진행합니다.")
-            processed_text = conversation_text
+            logger.warning("대화 통계 계산 중 오류 발생: %s", e)
         
-        # 1. 판매자/관리자 메시지만 추출
-        seller_messages = extract_seller_messages(processed_text)
-        logger.info(f"총 {len(seller_messages)}개의 판매자 메시지를 추출했습니다.")
-        
-        # 판매자 메시지를 하나의 문자열로 결합
-        seller_text = "\n\n".join(seller_messages)
-        logger.info(f"판매자 메시지 길이: {len(seller_text)} 문자")
-        
-        # 판매자 메시지만 전달하여 상품 정보 추출
+        # 1. 상품 정보 추출
+        # 전처리와 판매자 메시지 추출은 extract_product_info 내부에서 수행되고 결과도 대화 해시로 캐시되므로,
+        # 여기서 같은 대화를 다시 전처리/분리하지 않음 (재시도·대체 경로에서 반복 호출되어도 한 번만 계산)
         logger.info("extract_product_info 함수를 사용하여 상품 정보 추출 시작")
-        product_info = extract_product_info(conversation_text)  # 이 부분은 내부에서 판매자 메시지를 추출함
+        product_info = extract_product_info(conversation_text)
         
         # 상품 정보에서 모든 상품 추출 (품절 여부에 상관없이)
         all_products = set()
         for category, products in product_info.items():
-            logger.info(f"'{category}' 카테고리에서 {len(products)}개 상품 발견")
+            logger.info("'%s' 카테고리에서 %d개 상품 발견", category, len(products))
             for product in products:
                 product_name = product.get("name", "").strip()
                 # 유효한 상품명인 경우 추가 (품절 여부에 상관없이)
                 if product_name and len(product_name) >= 2:
                     all_products.add(product_name)
         
-        logger.info(f"추출된 전체 상품: {len(all_products)}개")
+        logger.info("추출된 전체 상품: %d개", len(all_products))
         return all_products
         
     except Exception as e:
-        logger.error(f"상품 목록 추출 중 오류 발생: {str(e)}", exc_info=True)
+        logger.error("상품 목록 추출 중 오류 발생: %s", e, exc_info=True)
         # 오류 발생 시 빈 세트 반환
         return set()
 
@@ -284,10 +311,9 @@ def extract_products_with_llm(text: str) -> List[Dict[str, Any]]:
         }
     }]
     
-    for retry in range(MAX_RETRY_COUNT + 1):
-        try:
-            # 시스템 프롬프트 생성 - 가격, 설명 제외하고 품절 상태는 유지
-            system_prompt = """
+    # 프롬프트는 재시도마다 달라지지 않으므로 루프 밖에서 한 번만 생성
+    # 시스템 프롬프트 생성 - 가격, 설명 제외하고 품절 상태는 유지
+    system_prompt = """
 당신은 채팅 대화에서 판매 중인 상품 목록을 추출하는 전문가입니다.
 대화 내용을 분석하여 판매 중인 상품 목록(품절된 상품 포함)을 추출해야 합니다.
 
@@ -332,8 +358,8 @@ def extract_products_with_llm(text: str) -> List[Dict[str, Any]]:
 반드시 extract_products 도구를 사용하여 결과를 제공하세요. 모든 언급된 상품을 빠짐없이 추출하세요. 품절된 상품도 반드시 포함하세요.
 """
 
-            # 사용자 프롬프트 생성
-            user_prompt = f"""
+    # 사용자 프롬프트 생성
+    user_prompt = f"""
 아래 카카오톡 대화 내용에서 판매 중인 모든 상품 목록(품절 포함)을 추출해주세요:
 
 {text}
@@ -343,9 +369,11 @@ def extract_products_with_llm(text: str) -> List[Dict[str, Any]]:
 extract_products 도구를 사용하여 결과를 제공해주세요.
 """
 
+    for retry in range(MAX_RETRY_COUNT + 1):
+        try:
             # LLM API 호출 with 도구 사용 (function calling)
-            logger.info(f"품목 추출을 위한 LLM API 호출 중... (시도 {retry+1}/{MAX_RETRY_COUNT+1})")
-            logger.info(f"입력 텍스트 길이: {len(text)} 자")
+            logger.info("품목 추출을 위한 LLM API 호출 중... (시도 %d/%d)", retry + 1, MAX_RETRY_COUNT + 1)
+            logger.info("입력 텍스트 길이: %d 자", len(text))
             
             response = client.messages.create(
                 model=CLAUDE_MODEL,
@@ -377,7 +405,7 @@ extract_products 도구를 사용하여 결과를 제공해주세요.
             # products 필드 확인
             if "products" in result and isinstance(result["products"], list):
                 products = result["products"]
-                logger.info(f"LLM에서 {len(products)}개 상품 추출 성공")
+                logger.info("LLM에서 %d개 상품 추출 성공", len(products))
                 return products
             else:
                 logger.warning("응답에서 products 필드가 없거나 유효하지 않습니다.")
@@ -386,9 +414,9 @@ extract_products 도구를 사용하여 결과를 제공해주세요.
                 return []
                 
         except Exception as e:
-            logger.error(f"LLM 추출 중 오류 발생: {str(e)}", exc_info=True)
+            logger.error("LLM 추출 중 오류 발생: %s", e, exc_info=True)
             if retry < MAX_RETRY_COUNT:
-                logger.info(f"재시도 중... ({retry+1}/{MAX_RETRY_COUNT})")
+                logger.info("재시도 중... (%d/%d)", retry + 1, MAX_RETRY_COUNT)
                 continue
             else:
                 logger.error("모든 재시도 후에도 실패했습니다.")
@@ -404,24 +432,33 @@ def extract_product_info(conversation_text: str) -> Dict[str, List[Dict[str, Any
     Returns:
         Dict[str, List[Dict[str, Any]]]: 상품 정보 목록
     """
+    # 같은 대화 내용이면 캐시된 결과 사용 (큰 텍스트 대신 고정 길이 해시를 키로 사용)
+    cache_key = hashlib.blake2b(conversation_text.encode('utf-8'), digest_size=16).digest()
+    with _product_info_cache_lock:
+        cached_result = _product_info_cache.get(cache_key)
+    if cached_result is not None:
+        logger.info("캐시된 상품 정보 사용: 총 %d개 상품", len(cached_result['products']))
+        # 호출자가 결과를 수정해도 캐시가 오염되지 않도록 복사본 반환
+        return {"products": [dict(product) for product in cached_result["products"]]}
+    
     # 전처리: 불필요한 메시지 제거
     try:
-        logger.info(f"원본 대화 길이: {len(conversation_text)} 문자")
+        logger.info("원본 대화 길이: %d 문자", len(conversation_text))
         # 전처리 실행
         processed_text = chat_preprocessor.preprocess_chat(conversation_text)
-        logger.info(f"전처리 후 대화 길이: {len(processed_text)} 문자")
+        logger.info("전처리 후 대화 길이: %d 문자", len(processed_text))
     except Exception as e:
-        logger.warning(f"대화 전처리 중 오류 발생: {str(e)}")
+        logger.warning("대화 전처리 중 오류 발생: %s", e)
         logger.warning("원본 대화로 계속 진행합니다.")
         processed_text = conversation_text
     
     # 판매자 메시지만 추출
     seller_messages = extract_seller_messages(processed_text)
-    logger.info(f"추출된 판매자 메시지: {len(seller_messages)}개")
+    logger.info("추출된 판매자 메시지: %d개", len(seller_messages))
     
     # 판매자 메시지를 하나의 문자열로 결합
     seller_text = "\n\n".join(seller_messages)
-    logger.info(f"판매자 메시지 길이: {len(seller_text)} 문자")
+    logger.info("판매자 메시지 길이: %d 문자", len(seller_text))
     
     # LLM으로 상품 목록 추출 (판매자 메시지만 사용)
     products = extract_products_with_llm(seller_text)
@@ -442,6 +479,11 @@ def extract_product_info(conversation_text: str) -> Dict[str, List[Dict[str, Any
         })
     
     # 결과 로깅
-    logger.info(f"상품 정보 추출 완료: 총 {len(result['products'])}개 상품")
+    logger.info("상품 정보 추출 완료: 총 %d개 상품", len(result['products']))
+    
+    # LLM 호출 실패 시에도 빈 목록이 반환되므로, 상품이 추출된 경우에만 캐시
+    if result["products"]:
+        with _product_info_cache_lock:
+            _product_info_cache[cache_key] = {"products": [dict(product) for product in result["products"]]}
     
     return result
\ No newline at end of file
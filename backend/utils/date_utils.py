@@ -2,6 +2,12 @@ import re
 from datetime import datetime
 from typing import Optional, Tuple
 
+# 한국어 날짜 형식 (YYYY년 MM월 DD일)
+_KOREAN_DATE_PATTERN = re.compile(r'(\d{4})년\s*(\d{1,2})월\s*(\d{1,2})일')
+
+# 시간 형식 (HH:MM 오전/오후)
+_TIME_PATTERN = re.compile(r'(\d{1,2}):(\d{2})\s*(오전|오후)?')
+
 def parse_korean_date(date_str: Optional[str]) -> Optional[str]:
     """
     "YYYY년 MM월 DD일" 형식을 "YYYY-MM-DD" 형식으로 변환합니다.
@@ -16,7 +22,7 @@ def parse_korean_date(date_str: Optional[str]) -> Optional[str]:
         return None
         
     # 정규식으로 연, 월, 일 추출
-    match = re.search(r'(\d{4})년\s*(\d{1,2})월\s*(\d{1,2})일', date_str)
+    match = _KOREAN_DATE_PATTERN.search(date_str)
     if match:
         year = int(match.group(1))
         month = int(match.group(2))
@@ -87,7 +93,7 @@ def extract_timestamp_from_line(line: str) -> Tuple[Optional[str], Optional[str]
     time = None
     
     # 날짜 추출 (YYYY년 MM월 DD일)
-    date_match = re.search(r'(\d{4})년\s*(\d{1,2})월\s*(\d{1,2})일', line)
+    date_match = _KOREAN_DATE_PATTERN.search(line)
     if date_match:
         year = int(date_match.group(1))
         month = int(date_match.group(2))
@@ -95,7 +101,7 @@ def extract_timestamp_from_line(line: str) -> Tuple[Optional[str], Optional[str]
         date = f"{year}-{month:02d}-{day:02d}"
     
     # 시간 추출 (HH:MM 오전/오후)
-    time_match = re.search(r'(\d{1,2}):(\d{2})\s*(오전|오후)?', line)
+    time_match = _TIME_PATTERN.search(line)
     if time_match:
         hour = int(time_match.group(1))
         minute = int(time_match.group(2))
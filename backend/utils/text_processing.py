@@ -1,8 +1,47 @@
+import logging
 import re
-from typing import List, Dict, Set
+from typing import List, Dict, Set, Optional, Iterator, Tuple
 from config import SELLER_KEYWORDS
 
-def filter_conversation_by_date(conversation_text: str, start_date: str = None, end_date: str = None) -> str:
+logger = logging.getLogger(__name__)
+
+# 카카오톡 날짜 구분선 패턴
+_DATE_DIVIDER_PATTERN = re.compile(r'--------------- (\d{4})년 (\d{1,2})월 (\d{1,2})일 ---------------')
+
+# 날짜 구분선 또는 메시지 라인의 날짜 형식 (공백이 라인을 넘어가지 않도록 줄바꿈은 제외)
+_DATE_LINE_PATTERN = re.compile(
+    r'--------------- (\d{4})년 (\d{1,2})월 (\d{1,2})일 ---------------'
+    r'|(\d{4})년[^\S\n]*(\d{1,2})월[^\S\n]*(\d{1,2})일[^\S\n]*(?:오전|오후)'
+)
+
+# 판매자 키워드를 하나의 정규식 대안(alternation)으로 미리 컴파일 (긴 키워드 우선)
+_SELLER_KEYWORD_PATTERN = re.compile('|'.join(map(re.escape, sorted(SELLER_KEYWORDS, key=len, reverse=True))))
+
+# 연속 공백 정규화 패턴
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# ISO 형식 날짜 (YYYY-MM-DD, 뒤에 시간이 붙어도 날짜 부분만 사용)
+_ISO_DATE_PATTERN = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+
+def _date_key(iso_date: Optional[str]) -> Optional[int]:
+    """
+    ISO 형식 날짜를 비교용 정수 키(YYYYMMDD)로 변환합니다.
+    
+    Args:
+        iso_date: ISO 형식 날짜 문자열
+        
+    Returns:
+        정수 날짜 키, 변환할 수 없으면 None
+    """
+    if not iso_date:
+        return None
+    match = _ISO_DATE_PATTERN.match(iso_date)
+    if not match:
+        return None
+    year, month, day = match.groups()
+    return int(year) * 10000 + int(month) * 100 + int(day)
+
+def filter_conversation_by_date(conversation_text: str, start_date: str = None, end_date: str = None) -> Optional[str]:
     """
     날짜 범위에 따라 대화 내용을 필터링합니다.
     
@@ -12,7 +51,7 @@ def filter_conversation_by_date(conversation_text: str, start_date: str = None,
         end_date: 종료일 (ISO 형식 또는 'YYYY년 MM월 DD일' 형식), None이면 제한 없음
         
     Returns:
-        필터링된 대화 내용
+        필터링된 대화 내용, 지정된 날짜 범위에 해당하는 대화가 없으면 None
     """
     from utils.date_utils import parse_korean_date
     
@@ -21,63 +60,123 @@ def filter_conversation_by_date(conversation_text: str, start_date: str = None,
         return conversation_text
     
     # 디버깅용 로그
-    print(f"날짜 필터링 시작: start_date={start_date}, end_date={end_date}")
+    logger.debug("날짜 필터링 시작: start_date=%s, end_date=%s", start_date, end_date)
     
     # 한국어 날짜를 ISO 형식으로 변환
     if start_date and "년" in start_date:
         iso_start_date = parse_korean_date(start_date)
-        print(f"한국어 날짜 변환: {start_date} -> {iso_start_date}")
+        logger.debug("한국어 날짜 변환: %s -> %s", start_date, iso_start_date)
         start_date = iso_start_date
     
     if end_date and "년" in end_date:
         iso_end_date = parse_korean_date(end_date)
-        print(f"한국어 날짜 변환: {end_date} -> {iso_end_date}")
+        logger.debug("한국어 날짜 변환: %s -> %s", end_date, iso_end_date)
         end_date = iso_end_date
     
-    # 날짜 필터링을 위한 패턴
-    # 1. 카카오톡 날짜 구분선
-    date_pattern1 = r'--------------- (\d{4})년 (\d{1,2})월 (\d{1,2})일 ---------------'
-    # 2. 메시지 라인의 날짜 형식
-    date_pattern2 = r'(\d{4})년\s*(\d{1,2})월\s*(\d{1,2})일\s*(?:오전|오후)'
-    
-    lines = conversation_text.split('\n')
-    filtered_lines = []
+    # 날짜 비교는 문자열 대신 정수 키(YYYYMMDD)로 수행
+    start_key = _date_key(start_date)
+    end_key = _date_key(end_date)
     
-    include_lines = True
-    current_date = None
+    # 날짜가 있는 라인만 한 번의 정규식 스캔으로 찾고, 라인 사이 구간은 슬라이스로 통째로 포함/제외
+    slices = []
+    include_region = True
+    region_start = 0
+    text_length = len(conversation_text)
+    pos = 0
     
-    for line in lines:
-        # 1. 날짜 구분선 확인
-        date_match = re.search(date_pattern1, line)
+    while True:
+        date_match = _DATE_LINE_PATTERN.search(conversation_text, pos)
         if not date_match:
-            # 2. 메시지 라인에서 날짜 추출 시도
-            date_match = re.search(date_pattern2, line)
+            break
         
-        if date_match:
-            year = int(date_match.group(1))
-            month = int(date_match.group(2))
-            day = int(date_match.group(3))
-            current_date = f"{year}-{month:02d}-{day:02d}"
-            
-            # 날짜 범위 체크
-            include_lines = True
-            if start_date and current_date < start_date:
-                include_lines = False
-            if end_date and current_date > end_date:
-                include_lines = False
-                    
-        if include_lines:
-            filtered_lines.append(line)
-    
-    # 필터링된 내용이 없으면 안내 메시지 반환
-    if not filtered_lines:
-        return "지정된 날짜 범위에 해당하는 대화가 없습니다."
-    
-    filtered_text = '\n'.join(filtered_lines)
-    print(f"필터링 전 라인 수: {len(lines)}, 필터링 후 라인 수: {len(filtered_lines)}")
+        line_start = conversation_text.rfind('\n', 0, date_match.start()) + 1
+        line_end = conversation_text.find('\n', date_match.end())
+        if line_end == -1:
+            line_end = text_length
+        
+        # 이전 날짜 라인부터 현재 날짜 라인 직전까지의 구간 처리
+        if line_start > region_start and include_region:
+            slices.append(conversation_text[region_start:line_start])
+        
+        # 1. 날짜 구분선 확인 (같은 라인에서는 메시지 날짜보다 구분선이 우선)
+        if date_match.group(1) is not None:
+            date_groups = date_match.group(1, 2, 3)
+        else:
+            divider_match = _DATE_DIVIDER_PATTERN.search(conversation_text, date_match.start() + 1, line_end)
+            # 2. 메시지 라인의 날짜 형식
+            date_groups = divider_match.groups() if divider_match else date_match.group(4, 5, 6)
+        
+        year, month, day = date_groups
+        current_key = int(year) * 10000 + int(month) * 100 + int(day)
+        
+        # 날짜 범위 체크
+        include_region = True
+        if start_key is not None and current_key < start_key:
+            include_region = False
+        if end_key is not None and current_key > end_key:
+            include_region = False
+        
+        region_start = line_start
+        pos = line_end + 1
+    
+    # 마지막 구간 처리
+    if include_region:
+        slices.append(conversation_text[region_start:])
+    
+    # 필터링된 내용이 없으면 None 반환
+    if not slices:
+        return None
+    
+    filtered_text = ''.join(slices)
+    if not include_region:
+        # 제외된 구간 앞의 줄바꿈은 라인 구분자이므로 제거
+        filtered_text = filtered_text[:-1]
+    
+    # 라인 수 집계는 로그에만 쓰이므로 DEBUG 레벨이 꺼져 있으면 세지 않음
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("필터링 전 라인 수: %d, 필터링 후 라인 수: %d",
+                     conversation_text.count('\n') + 1, filtered_text.count('\n') + 1)
     
     return filtered_text
 
+def _iter_lines(text: str) -> Iterator[Tuple[int, int]]:
+    """
+    텍스트의 각 라인 위치를 줄바꿈 기준 split()과 같은 기준으로 반환합니다 (마지막 빈 라인 포함).
+    
+    Args:
+        text: 나눌 텍스트
+        
+    Yields:
+        (라인 시작 위치, 라인 끝 위치) 튜플 (줄바꿈 문자는 포함하지 않음)
+    """
+    pos = 0
+    while True:
+        newline_pos = text.find('\n', pos)
+        if newline_pos == -1:
+            yield pos, len(text)
+            return
+        yield pos, newline_pos
+        pos = newline_pos + 1
+
+def _iter_date_blocks(conversation_text: str) -> Iterator[str]:
+    """
+    대화를 날짜 구분선 단위 블록으로 나눕니다 (구분선은 해당 블록의 첫 줄에 포함).
+    
+    Args:
+        conversation_text: 전체 대화 내용
+        
+    Yields:
+        첫 구분선 이전 내용, 이후 각 날짜 구분선부터 다음 구분선 직전까지의 블록
+    """
+    block_start = 0
+    for divider_match in _DATE_DIVIDER_PATTERN.finditer(conversation_text):
+        divider_start = divider_match.start()
+        if divider_start > block_start:
+            yield conversation_text[block_start:divider_start]
+        block_start = divider_start
+    if block_start < len(conversation_text):
+        yield conversation_text[block_start:]
+
 def split_conversation_into_chunks(conversation_text: str, chunk_size: int = 32000) -> List[str]:
     """
     긴 대화를 처리하기 쉬운 청크로 분할합니다.
@@ -89,74 +188,75 @@ def split_conversation_into_chunks(conversation_text: str, chunk_size: int = 320
     Returns:
         대화 청크 리스트
     """
-    chunks = []
-    current_chunk = ""
-    current_size = 0
+    chunks = list(iter_conversation_chunks(conversation_text, chunk_size))
     
-    # 날짜 구분선 패턴
-    date_pattern = r'--------------- \d{4}년 \d{1,2}월 \d{1,2}일 ---------------'
+    # 청크 크기 로깅 (DEBUG 레벨이 꺼져 있으면 청크를 다시 순회하지 않음)
+    if logger.isEnabledFor(logging.DEBUG):
+        for i, chunk in enumerate(chunks):
+            logger.debug("청크 %d 크기: %d 문자", i + 1, len(chunk))
+            logger.debug("청크 %d 내용 미리보기: %s...", i + 1, chunk[:100])
     
-    # 날짜별로 분할
-    date_blocks = re.split(f"({date_pattern})", conversation_text)
+    return chunks
+
+def iter_conversation_chunks(conversation_text: str, chunk_size: int = 32000) -> Iterator[str]:
+    """
+    긴 대화를 청크로 분할하면서 완성된 청크를 바로 내보냅니다.
+    전체 분할이 끝나기 전에 앞쪽 청크의 분석을 시작할 수 있습니다.
     
-    i = 0
-    while i < len(date_blocks):
-        # 날짜 구분선이 있는 경우
-        if i < len(date_blocks) - 1 and re.match(date_pattern, date_blocks[i]):
-            date_line = date_blocks[i]
-            content = date_blocks[i+1] if i+1 < len(date_blocks) else ""
-            block = date_line + content
-            i += 2
-        else:
-            # 날짜 구분선이 없는 경우
-            block = date_blocks[i]
-            i += 1
+    Args:
+        conversation_text: 전체 대화 내용
+        chunk_size: 각 청크의 최대 크기(문자 수)
         
+    Yields:
+        대화 청크
+    """
+    # 문자열 += 반복은 이차 시간이 걸리므로 조각을 리스트에 모아 두었다가 한 번에 합침
+    current_parts = []
+    current_size = 0
+    
+    # 날짜 구분선 단위 블록별로 처리
+    for block in _iter_date_blocks(conversation_text):
         block_size = len(block)
         
         # 블록이 너무 크면 라인 단위로 추가 분할
+        # (라인 문자열을 따로 만들지 않고 라인 위치만으로 블록을 잘라냄)
         if block_size > chunk_size:
-            lines = block.split('\n')
-            temp_chunk = ""
-            for line in lines:
-                line_size = len(line) + 1  # +1 for newline
-                if len(temp_chunk) + line_size > chunk_size:
-                    chunks.append(temp_chunk)
-                    temp_chunk = line + '\n'
+            piece_start = 0
+            temp_size = 0
+            for line_start, line_end in _iter_lines(block):
+                line_size = line_end - line_start + 1  # +1 for newline
+                if temp_size + line_size > chunk_size:
+                    yield block[piece_start:line_start]
+                    piece_start = line_start
+                    temp_size = line_size
                 else:
-                    temp_chunk += line + '\n'
+                    temp_size += line_size
             
-            if temp_chunk:
-                if current_size + len(temp_chunk) <= chunk_size:
-                    current_chunk += temp_chunk
-                    current_size += len(temp_chunk)
-                else:
-                    if current_chunk:
-                        chunks.append(current_chunk)
-                    current_chunk = temp_chunk
-                    current_size = len(temp_chunk)
+            # 마지막 라인에도 줄바꿈을 붙여 각 라인이 줄바꿈으로 끝나도록 맞춤
+            temp_chunk = block[piece_start:] + '\n'
+            if current_size + temp_size <= chunk_size:
+                current_parts.append(temp_chunk)
+                current_size += temp_size
+            else:
+                if current_size:
+                    yield ''.join(current_parts)
+                current_parts = [temp_chunk]
+                current_size = temp_size
         else:
             # 블록이 청크 크기보다 작으면 현재 청크에 추가
             if current_size + block_size <= chunk_size:
-                current_chunk += block
+                current_parts.append(block)
                 current_size += block_size
             else:
-                # 현재 청크를 저장하고 새 청크 시작
-                if current_chunk:
-                    chunks.append(current_chunk)
-                current_chunk = block
+                # 현재 청크를 내보내고 새 청크 시작
+                if current_size:
+                    yield ''.join(current_parts)
+                current_parts = [block]
                 current_size = block_size
     
-    # 마지막 청크 추가
-    if current_chunk:
-        chunks.append(current_chunk)
-    
-    # 청크 크기 로깅
-    for i, chunk in enumerate(chunks):
-        print(f"청크 {i+1} 크기: {len(chunk)} 문자")
-        print(f"청크 {i+1} 내용 미리보기: {chunk[:100]}...")
-    
-    return chunks
+    # 마지막 청크
+    if current_size:
+        yield ''.join(current_parts)
 
 def is_seller_message(message_line: str) -> bool:
     """
@@ -168,10 +268,7 @@ def is_seller_message(message_line: str) -> bool:
     Returns:
         판매자 메시지이면 True, 아니면 False
     """
-    for keyword in SELLER_KEYWORDS:
-        if keyword in message_line:
-            return True
-    return False
+    return _SELLER_KEYWORD_PATTERN.search(message_line) is not None
 
 def clean_text(text: str) -> str:
     """
@@ -187,7 +284,7 @@ def clean_text(text: str) -> str:
         return ""
     
     # 공백 정규화
-    text = re.sub(r'\s+', ' ', text.strip())
+    text = _WHITESPACE_PATTERN.sub(' ', text.strip())
     
     # 특수 기호 정리
     text = text.replace('\u200b', '')  # 제로 폭 공백 제거
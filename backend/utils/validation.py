@@ -1,5 +1,37 @@
+import logging
+import re
+from functools import lru_cache
+from operator import itemgetter
 from typing import List, Dict, Any, Set, Optional
 
+logger = logging.getLogger(__name__)
+
+# 판매 품목으로 적합하지 않은 단어 (단독으로 사용된 경우만 필터링)
+_INVALID_ITEM_KEYWORDS = frozenset({
+    "안녕", "네", "오늘", "내일", "작성", "일정", "배송", "입금", "마감", "확인",
+    "주말", "감사", "연락", "안내", "공지", "판매", "전달", "변경", "추가", "픽업"
+})
+
+# 주문자로 적합하지 않은 키워드 (포함 여부를 한 번의 검색으로 확인)
+_INVALID_CUSTOMER_RE = re.compile("|".join(map(re.escape, [
+    "안내", "공지", "판매", "배송", "마감", "주문", "픽업",
+    "알림", "공구", "시작", "관리자", "사장님", "대표"
+])))
+
+# 수량 문자열에서 제거할 문자 (천 단위 쉼표)
+_QUANTITY_TRANS = str.maketrans("", "", ",")
+
+# 분석 결과 필수 필드와 누락 시 채울 기본값 생성 함수
+_RESULT_FIELD_DEFAULTS = {
+    "time_based_orders": list,
+    "item_based_summary": list,
+    "customer_based_orders": list,
+    "table_summary": lambda: {"headers": [], "rows": []},
+    "order_pattern_analysis": lambda: {"peak_hours": [], "popular_items": [], "sold_out_items": []},
+}
+_REQUIRED_RESULT_FIELDS = tuple(_RESULT_FIELD_DEFAULTS)
+
+@lru_cache(maxsize=4096)
 def is_valid_item_name(item_name: str) -> bool:
     """
     품목명이 유효한지 검증합니다.
@@ -10,21 +42,16 @@ def is_valid_item_name(item_name: str) -> bool:
     Returns:
         유효한 품목명이면 True, 아니면 False
     """
-    if not item_name or len(item_name.strip()) < 2:
+    # 너무 긴 품목명 제한 (strip 전에 길이로 먼저 거름)
+    if not item_name or len(item_name) > 50:
         return False
-        
-    # 너무 긴 품목명 제한
-    if len(item_name) > 50:
+    
+    stripped = item_name.strip()
+    if len(stripped) < 2:
         return False
         
-    # 판매 품목으로 적합하지 않은 단어 필터링
-    invalid_keywords = [
-        "안녕", "네", "오늘", "내일", "작성", "일정", "배송", "입금", "마감", "확인",
-        "주말", "감사", "연락", "안내", "공지", "판매", "전달", "변경", "추가", "픽업"
-    ]
-    
-    # 단독으로 사용된 경우만 필터링
-    if item_name.strip() in invalid_keywords:
+    # 판매 품목으로 적합하지 않은 단어가 단독으로 사용된 경우 필터링
+    if stripped in _INVALID_ITEM_KEYWORDS:
         return False
         
     return True
@@ -42,7 +69,7 @@ def is_valid_order_format(order: Dict[str, Any]) -> bool:
     required_fields = ["customer", "item", "quantity"]
     for field in required_fields:
         if field not in order:
-            print(f"주문 검증 실패: '{field}' 필드 누락")
+            logger.warning("주문 검증 실패: '%s' 필드 누락", field)
             return False
     
     # 수량 검증
@@ -50,14 +77,13 @@ def is_valid_order_format(order: Dict[str, Any]) -> bool:
         quantity = order.get("quantity")
         if quantity is not None:
             if isinstance(quantity, str):
-                # 문자열 수량을 숫자로 변환 시도
-                quantity = quantity.replace(",", "").strip()
-                int(quantity)
+                # 문자열 수량을 숫자로 변환 시도 (앞뒤 공백은 int()가 처리)
+                int(quantity.translate(_QUANTITY_TRANS))
             else:
                 # 이미 숫자 타입인지 확인
                 int(quantity)
     except ValueError:
-        print(f"주문 검증 실패: 잘못된 수량 형식 - '{order.get('quantity')}'")
+        logger.warning("주문 검증 실패: 잘못된 수량 형식 - '%s'", order.get('quantity'))
         return False
     
     return True
@@ -75,73 +101,45 @@ def validate_analysis_result(result: Dict[str, Any]) -> Dict[str, Any]:
     if not result:
         result = {}
     
-    # 필수 필드 확인
-    required_fields = [
-        "time_based_orders", 
-        "item_based_summary", 
-        "customer_based_orders", 
-        "table_summary", 
-        "order_pattern_analysis"
-    ]
-    
-    for field in required_fields:
+    # 필수 필드 확인 (누락된 필드만 정의 순서대로 기본값으로 채움)
+    for field in _REQUIRED_RESULT_FIELDS:
         if field not in result:
-            print(f"⚠️ 경고: {field} 필드가 응답에 없습니다!")
-            
-            if field == "time_based_orders":
-                result[field] = []
-            elif field == "item_based_summary":
-                result[field] = []
-            elif field == "customer_based_orders":
-                result[field] = []
-            elif field == "table_summary":
-                result[field] = {
-                    "headers": [],
-                    "rows": []
-                }
-            elif field == "order_pattern_analysis":
-                result[field] = {
-                    "peak_hours": [],
-                    "popular_items": [],
-                    "sold_out_items": []
-                }
-    
-    # 필드 내부 구조 검증
-    if "table_summary" in result and isinstance(result["table_summary"], dict):
-        if "headers" not in result["table_summary"]:
-            result["table_summary"]["headers"] = []
-        if "rows" not in result["table_summary"]:
-            result["table_summary"]["rows"] = []
+            logger.warning("%s 필드가 응답에 없습니다.", field)
+            result[field] = _RESULT_FIELD_DEFAULTS[field]()
+    
+    # 필드 내부 구조 검증 (필수 필드는 위에서 모두 채워졌으므로 하위 키만 보완)
+    table_summary = result["table_summary"]
+    if isinstance(table_summary, dict):
+        table_summary.setdefault("headers", [])
+        rows = table_summary.setdefault("rows", [])
             
         # 테이블 요약에서 '등 다수' 처리 - 품목별 요약에서 완전한 주문자 목록 가져오기
-        if "item_based_summary" in result and "rows" in result["table_summary"]:
-            item_to_customers = {}
-            
-            # 품목별 요약에서 주문자 목록 추출
-            for item_summary in result["item_based_summary"]:
-                if "item" in item_summary and "customers" in item_summary:
-                    item_to_customers[item_summary["item"]] = item_summary["customers"]
-            
-            # 행별로 '등 다수' 제거하고 완전한 주문자 목록으로 대체
-            for i, row in enumerate(result["table_summary"]["rows"]):
-                if len(row) >= 3:  # 품목, 수량, 주문자 컬럼이 있는지 확인
-                    item_name = str(row[0])
-                    if item_name in item_to_customers:
-                        # '등 다수'가 있거나 주문자 수가 다를 경우 교체
-                        current_customers = str(row[2])
-                        full_customers = item_to_customers[item_name]
-                        
-                        if "등 다수" in current_customers or len(current_customers.split(',')) != len(full_customers.split(',')):
-                            print(f"테이블 요약 수정: {item_name}의 주문자 목록을 완전한 목록으로 교체합니다.")
-                            result["table_summary"]["rows"][i][2] = full_customers
-    
-    if "order_pattern_analysis" in result and isinstance(result["order_pattern_analysis"], dict):
-        if "peak_hours" not in result["order_pattern_analysis"]:
-            result["order_pattern_analysis"]["peak_hours"] = []
-        if "popular_items" not in result["order_pattern_analysis"]:
-            result["order_pattern_analysis"]["popular_items"] = []
-        if "sold_out_items" not in result["order_pattern_analysis"]:
-            result["order_pattern_analysis"]["sold_out_items"] = []
+        # 품목별 요약에서 주문자 목록과 구분 쉼표 개수를 한 번만 계산
+        item_to_customers = {
+            item_summary["item"]: (item_summary["customers"], str(item_summary["customers"]).count(","))
+            for item_summary in result["item_based_summary"]
+            if "item" in item_summary and "customers" in item_summary
+        }
+        
+        # 행별로 '등 다수' 제거하고 완전한 주문자 목록으로 대체
+        for row in rows:
+            if len(row) >= 3:  # 품목, 수량, 주문자 컬럼이 있는지 확인
+                item_name = str(row[0])
+                if item_name in item_to_customers:
+                    # '등 다수'가 있거나 주문자 수가 다를 경우 교체
+                    current_customers = str(row[2])
+                    full_customers, full_comma_count = item_to_customers[item_name]
+                    
+                    # 저렴한 부분 문자열 검사를 먼저 하고, 없을 때만 쉼표 개수 비교
+                    if "등 다수" in current_customers or current_customers.count(",") != full_comma_count:
+                        logger.info("테이블 요약 수정: %s의 주문자 목록을 완전한 목록으로 교체합니다.", item_name)
+                        row[2] = full_customers
+    
+    order_pattern_analysis = result["order_pattern_analysis"]
+    if isinstance(order_pattern_analysis, dict):
+        order_pattern_analysis.setdefault("peak_hours", [])
+        order_pattern_analysis.setdefault("popular_items", [])
+        order_pattern_analysis.setdefault("sold_out_items", [])
     
     return result
 
@@ -155,24 +153,20 @@ def filter_invalid_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     Returns:
         필터링된 품목 목록
     """
-    filtered_items = []
-    filtered_count = 0
-    
-    for item in items:
-        # 'item' 필드가 있는 경우 품목명 검증
-        if "item" in item and is_valid_item_name(item["item"]):
-            filtered_items.append(item)
-        # 'customer' 필드만 있는 경우 (customer_based_orders)
-        elif "customer" in item and "item" not in item:
-            filtered_items.append(item)
-        else:
-            filtered_count += 1
+    # 'item' 필드가 있으면 품목명 검증, 'customer' 필드만 있으면(customer_based_orders) 그대로 유지
+    filtered_items = [
+        item for item in items
+        if ("item" in item and is_valid_item_name(item["item"]))
+        or ("customer" in item and "item" not in item)
+    ]
+    filtered_count = len(items) - len(filtered_items)
     
     if filtered_count > 0:
-        print(f"품목 필터링: {filtered_count}개의 잘못된 품목명이 제외되었습니다.")
+        logger.info("품목 필터링: %d개의 잘못된 품목명이 제외되었습니다.", filtered_count)
     
     return filtered_items
 
+@lru_cache(maxsize=4096)
 def validate_customer_name(customer_name: str) -> bool:
     """
     주문자명이 유효한지 검증합니다.
@@ -191,14 +185,8 @@ def validate_customer_name(customer_name: str) -> bool:
         return False
     
     # 주문자로 적합하지 않은 키워드 필터링
-    invalid_keywords = [
-        "안내", "공지", "판매", "배송", "마감", "주문", "픽업",
-        "알림", "공구", "시작", "관리자", "사장님", "대표"
-    ]
-    
-    for keyword in invalid_keywords:
-        if keyword in customer_name:
-            return False
+    if _INVALID_CUSTOMER_RE.search(customer_name):
+        return False
     
     return True
 
@@ -212,11 +200,14 @@ def validate_quantity(quantity: Any) -> int:
     Returns:
         검증된 수량 (정수)
     """
+    # LLM 응답 수량은 대부분 이미 정수이므로 변환 없이 바로 반환
+    if type(quantity) is int:
+        return quantity
+    
     try:
         if isinstance(quantity, str):
-            # 쉼표 제거 및 공백 제거
-            quantity = quantity.replace(",", "").strip()
-            return int(quantity)
+            # 쉼표 제거 (앞뒤 공백은 int()가 처리)
+            return int(quantity.translate(_QUANTITY_TRANS))
         elif isinstance(quantity, (int, float)):
             return int(quantity)
         else:
@@ -240,20 +231,15 @@ def generate_table_summary(item_based_summary: List[Dict[str, Any]]) -> Dict[str
         "rows": []
     }
     
-    # 품목별 요약을 수량 기준으로 내림차순 정렬
-    sorted_items = sorted(
-        item_based_summary, 
-        key=lambda x: validate_quantity(x.get("total_quantity", 0)), 
-        reverse=True
-    )
+    # 품목별 수량을 한 번만 계산해 두고 수량 기준으로 내림차순 정렬
+    decorated = [(validate_quantity(item.get("total_quantity", 0)), item) for item in item_based_summary]
+    decorated.sort(key=itemgetter(0), reverse=True)
     
     # 정렬된 품목별 요약에서 테이블 행 생성
-    for item in sorted_items:
+    for total_quantity, item in decorated:
         item_name = item.get("item", "")
         if not item_name:
             continue
-            
-        total_quantity = validate_quantity(item.get("total_quantity", 0))
         
         # 주문자 목록을 콤마로 구분하여 가져오기
         customers = item.get("customers", "")